@@ -2,16 +2,21 @@ import streamlit as st
 import asyncio
 import threading
 import time
-import json
+import orjson
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 from datetime import datetime, timedelta
+from collections import Counter
+from dataclasses import dataclass, asdict, fields
+from typing import Any, Dict, List, Optional
+from itertools import islice
 import networkx as nx
 import plotly.figure_factory as ff
 
 from autonomous_agent import AutonomousAgent
+from config.config import get_config
 
 # Конфигурация страницы
 st.set_page_config(
@@ -77,6 +82,76 @@ class AgentInterface:
                 return f"Ошибка при обработке сообщения: {str(e)}"
         return "Агент не запущен"
 
+@dataclass(slots=True)
+class ChatMessage:
+    """Сообщение чата"""
+    type: str
+    content: str
+    timestamp: datetime
+    id: int
+    thinking_id: Optional[int] = None
+    time_str: str = ""  # Время для отображения, форматируется при добавлении
+
+@dataclass(slots=True)
+class ThinkingProcess:
+    """Процесс мышления агента при ответе на сообщение"""
+    user_message_id: int
+    thoughts: List[Dict[str, Any]]
+    response_time: datetime
+    new_thoughts_count: int
+    error: Optional[str] = None
+
+class ColumnStore:
+    """Колоночное хранилище записей: отдельный список на каждое поле"""
+    
+    def __init__(self, row_type):
+        self.row_type = row_type
+        self.columns = {field.name: [] for field in fields(row_type)}
+        self._size = 0
+    
+    def __len__(self):
+        return self._size
+    
+    def append(self, record) -> int:
+        """Добавить запись и вернуть ее индекс"""
+        for field, column in self.columns.items():
+            column.append(getattr(record, field))
+        self._size += 1
+        return self._size - 1
+    
+    def row(self, index: int):
+        """Собрать запись по индексу"""
+        return self.row_type(*(column[index] for column in self.columns.values()))
+    
+    def rows(self, start: int = 0):
+        """Итерировать записи начиная с индекса start"""
+        for index in range(max(0, start), self._size):
+            yield self.row(index)
+
+def _new_chat_history() -> ColumnStore:
+    return ColumnStore(ChatMessage)
+
+def _new_thinking_process() -> ColumnStore:
+    return ColumnStore(ThinkingProcess)
+
+# Иконки типов мыслей
+THOUGHT_ICONS = {
+    'observation': '👁️',
+    'hypothesis': '💡',
+    'analysis': '🔍',
+    'plan': '📋',
+    'decision': '✅',
+    'reflection': '🪞',
+    'critique': '❗',
+    'alternative': '🔄'
+}
+
+# Цвет уверенности: <=0.4, <=0.7, >0.7
+CONFIDENCE_COLORS = ("red", "orange", "green")
+
+# Сколько сообщений чата показывать за раз
+CHAT_WINDOW_STEP = 20
+
 # Инициализация интерфейса
 if 'agent_interface' not in st.session_state:
     st.session_state.agent_interface = AgentInterface()
@@ -689,16 +764,7 @@ def show_thought_tree(agent_status):
     
     if recent_thoughts:
         for thought in recent_thoughts:
-            thought_icon = {
-                'observation': '👁️',
-                'hypothesis': '💡',
-                'analysis': '🔍',
-                'plan': '📋',
-                'decision': '✅',
-                'reflection': '🪞',
-                'critique': '❗',
-                'alternative': '🔄'
-            }.get(thought.thought_type.value, '💭')
+            thought_icon = THOUGHT_ICONS.get(thought.thought_type.value, '💭')
             
             with st.expander(f"{thought_icon} {thought.content[:50]}..."):
                 st.write(f"**Полное содержание:** {thought.content}")
@@ -753,10 +819,13 @@ def show_chat_interface(agent_status):
     
     # Инициализация истории чата в session state
     if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
+        st.session_state.chat_history = _new_chat_history()
     
     if 'thinking_process' not in st.session_state:
-        st.session_state.thinking_process = []
+        st.session_state.thinking_process = _new_thinking_process()
+    
+    # Окно отображаемых сообщений (последние N)
+    st.session_state.setdefault("chat_window", CHAT_WINDOW_STEP)
     
     # Проверка статуса агента
     if not agent_status:
@@ -768,6 +837,27 @@ def show_chat_interface(agent_status):
         st.error("❌ Агент недоступен")
         return
     
+    _chat_fragment(agent)
+
+def _iter_chat_export_ndjson():
+    """Построчно сериализовать чат в NDJSON: заголовок, сообщения, процессы мышления"""
+    yield orjson.dumps({
+        "record": "header",
+        "export_time": datetime.now().isoformat(),
+        "messages_count": len(st.session_state.chat_history),
+        "thinking_processes_count": len(st.session_state.thinking_process)
+    }) + b"\n"
+    
+    for message in st.session_state.chat_history.rows():
+        yield orjson.dumps({"record": "message", **asdict(message)}, default=str, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+    
+    for thinking in st.session_state.thinking_process.rows():
+        yield orjson.dumps({"record": "thinking_process", **asdict(thinking)}, default=str, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+
+@st.fragment
+def _chat_fragment(agent):
+    """Фрагмент чата: история, ввод и управление перерисовываются без перезапуска всей страницы"""
+    
     # Контейнер для сообщений
     chat_container = st.container()
     
@@ -789,13 +879,14 @@ def show_chat_interface(agent_status):
     # Обработка отправки сообщения
     if send_button and user_input.strip():
         # Добавить сообщение пользователя в историю
-        user_message = {
-            "type": "user",
-            "content": user_input,
-            "timestamp": datetime.now(),
-            "id": len(st.session_state.chat_history)
-        }
-        st.session_state.chat_history.append(user_message)
+        now = datetime.now()
+        user_message_id = st.session_state.chat_history.append(ChatMessage(
+            type="user",
+            content=user_input,
+            timestamp=now,
+            id=len(st.session_state.chat_history),
+            time_str=now.strftime("%H:%M:%S")
+        ))
         
         # Показать процесс мышления агента
         with st.spinner("🤖 Агент думает..."):
@@ -810,12 +901,12 @@ def show_chat_interface(agent_status):
                 new_thoughts = len(agent.thought_tree.thoughts) - initial_thoughts
                 
                 # Получить последние мысли агента
-                recent_thoughts = list(agent.thought_tree.thoughts.values())[-new_thoughts:] if new_thoughts > 0 else []
+                recent_thoughts = list(islice(reversed(agent.thought_tree.thoughts.values()), new_thoughts))[::-1] if new_thoughts > 0 else []
                 
                 # Создать процесс мышления
-                thinking_process = {
-                    "user_message_id": user_message["id"],
-                    "thoughts": [
+                thinking_id = st.session_state.thinking_process.append(ThinkingProcess(
+                    user_message_id=user_message_id,
+                    thoughts=[
                         {
                             "content": thought.content,
                             "type": thought.thought_type.value,
@@ -823,87 +914,80 @@ def show_chat_interface(agent_status):
                             "timestamp": thought.created_at
                         } for thought in recent_thoughts
                     ],
-                    "response_time": datetime.now(),
-                    "new_thoughts_count": new_thoughts
-                }
-                
-                st.session_state.thinking_process.append(thinking_process)
+                    response_time=datetime.now(),
+                    new_thoughts_count=new_thoughts
+                ))
                 
             except Exception as e:
                 response = f"Извините, произошла ошибка при обработке вашего сообщения: {str(e)}"
-                thinking_process = {
-                    "user_message_id": user_message["id"],
-                    "thoughts": [],
-                    "response_time": datetime.now(),
-                    "new_thoughts_count": 0,
-                    "error": str(e)
-                }
-                st.session_state.thinking_process.append(thinking_process)
+                thinking_id = st.session_state.thinking_process.append(ThinkingProcess(
+                    user_message_id=user_message_id,
+                    thoughts=[],
+                    response_time=datetime.now(),
+                    new_thoughts_count=0,
+                    error=str(e)
+                ))
         
         # Добавить ответ агента в историю
-        agent_message = {
-            "type": "agent",
-            "content": response,
-            "timestamp": datetime.now(),
-            "id": len(st.session_state.chat_history),
-            "thinking_id": len(st.session_state.thinking_process) - 1
-        }
-        st.session_state.chat_history.append(agent_message)
-        
-        # Очистить поле ввода
-        st.rerun()
+        now = datetime.now()
+        st.session_state.chat_history.append(ChatMessage(
+            type="agent",
+            content=response,
+            timestamp=now,
+            id=len(st.session_state.chat_history),
+            thinking_id=thinking_id,
+            time_str=now.strftime("%H:%M:%S")
+        ))
+        st.session_state._chat_dirty = True
+    
+    # Перерисовать чат только если история изменилась
+    if st.session_state.pop("_chat_dirty", False):
+        st.rerun(scope="fragment")
     
     # Отображение истории чата
     with chat_container:
         if not st.session_state.chat_history:
             st.info("💡 **Начните диалог с агентом!**\n\nПримеры вопросов:\n- Привет! Расскажи о себе\n- Какие у тебя сейчас цели?\n- О чем ты думаешь?\n- Как ты оцениваешь свое состояние?")
         else:
-            for i, message in enumerate(st.session_state.chat_history):
-                if message["type"] == "user":
-                    # Сообщение пользователя
-                    st.markdown(f"""
-                    <div style="background-color: #e3f2fd; padding: 10px; border-radius: 10px; margin: 5px 0; border-left: 4px solid #2196f3;">
-                        <strong>👤 Вы ({message["timestamp"].strftime("%H:%M:%S")}):</strong><br>
-                        {message["content"]}
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                elif message["type"] == "agent":
-                    # Сообщение агента
-                    st.markdown(f"""
-                    <div style="background-color: #f3e5f5; padding: 10px; border-radius: 10px; margin: 5px 0; border-left: 4px solid #9c27b0;">
-                        <strong>🤖 Агент ({message["timestamp"].strftime("%H:%M:%S")}):</strong><br>
-                        {message["content"]}
-                    </div>
-                    """, unsafe_allow_html=True)
+            chat_window = st.session_state.chat_window
+            if len(st.session_state.chat_history) > chat_window:
+                st.button(
+                    f"⬆️ Загрузить ещё {CHAT_WINDOW_STEP} сообщений",
+                    on_click=lambda: st.session_state.__setitem__(
+                        "chat_window", st.session_state.chat_window + CHAT_WINDOW_STEP
+                    )
+                )
+            
+            thought_columns = st.session_state.thinking_process.columns["thoughts"]
+            last_message_id = len(st.session_state.chat_history) - 1
+            
+            for message in st.session_state.chat_history.rows(len(st.session_state.chat_history) - chat_window):
+                role = "user" if message.type == "user" else "assistant"
+                
+                with st.chat_message(role):
+                    author = "👤 Вы" if role == "user" else "🤖 Агент"
+                    st.caption(f"{author} ({message.time_str})")
+                    st.write(message.content)
                     
-                    # Показать процесс мышления
-                    if "thinking_id" in message and message["thinking_id"] < len(st.session_state.thinking_process):
-                        thinking = st.session_state.thinking_process[message["thinking_id"]]
+                    # Показать процесс мышления: раскрываемый блок только у последнего сообщения
+                    if role == "assistant" and message.thinking_id is not None and message.thinking_id < len(st.session_state.thinking_process):
+                        thoughts = thought_columns[message.thinking_id]
                         
-                        if thinking["thoughts"]:
-                            with st.expander(f"🧠 Процесс мышления ({thinking['new_thoughts_count']} новых мыслей)", expanded=False):
-                                for thought in thinking["thoughts"]:
-                                    thought_icon = {
-                                        'observation': '👁️',
-                                        'hypothesis': '💡',
-                                        'analysis': '🔍',
-                                        'plan': '📋',
-                                        'decision': '✅',
-                                        'reflection': '🪞',
-                                        'critique': '❗',
-                                        'alternative': '🔄'
-                                    }.get(thought["type"], '💭')
-                                    
-                                    confidence_color = "green" if thought["score"] > 0.7 else "orange" if thought["score"] > 0.4 else "red"
-                                    
-                                    st.markdown(f"""
-                                    <div style="background-color: #f8f9fa; padding: 8px; border-radius: 5px; margin: 3px 0; border-left: 3px solid #6c757d;">
-                                        <strong>{thought_icon} {thought["type"].title()}:</strong><br>
-                                        {thought["content"]}<br>
-                                        <small style="color: {confidence_color};">Уверенность: {thought["score"]:.2f}</small>
-                                    </div>
-                                    """, unsafe_allow_html=True)
+                        if not thoughts:
+                            continue
+                        
+                        if message.id != last_message_id:
+                            st.caption(f"🧠 {len(thoughts)} мыслей")
+                            continue
+                        
+                        with st.expander(f"🧠 Процесс мышления ({len(thoughts)} новых мыслей)", expanded=False):
+                            for thought in thoughts:
+                                thought_icon = THOUGHT_ICONS.get(thought["type"], '💭')
+                                
+                                confidence_color = CONFIDENCE_COLORS[(thought["score"] > 0.4) + (thought["score"] > 0.7)]
+                                
+                                st.markdown(f"**{thought_icon} {thought['type'].title()}:** {thought['content']}")
+                                st.caption(f":{confidence_color}[Уверенность: {thought['score']:.2f}]")
     
     # Кнопки управления чатом
     st.markdown("---")
@@ -911,39 +995,39 @@ def show_chat_interface(agent_status):
     
     with col1:
         if st.button("🗑️ Очистить Чат"):
-            st.session_state.chat_history = []
-            st.session_state.thinking_process = []
+            if st.session_state.chat_history:
+                st.session_state.chat_history = _new_chat_history()
+                st.session_state.thinking_process = _new_thinking_process()
+                st.session_state.chat_window = CHAT_WINDOW_STEP
+                st.session_state._chat_dirty = True
             st.success("Чат очищен!")
-            st.rerun()
+            if st.session_state.pop("_chat_dirty", False):
+                st.rerun(scope="fragment")
     
     with col2:
         if st.button("💾 Экспорт Чата"):
-            chat_export = {
-                "export_time": datetime.now().isoformat(),
-                "messages": st.session_state.chat_history,
-                "thinking_processes": st.session_state.thinking_process
-            }
             st.download_button(
-                label="📥 Скачать JSON",
-                data=json.dumps(chat_export, ensure_ascii=False, indent=2, default=str),
-                file_name=f"agent_chat_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                mime="application/json"
+                label="📥 Скачать NDJSON",
+                data=b"".join(_iter_chat_export_ndjson()),
+                file_name=f"agent_chat_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson",
+                mime="application/x-ndjson"
             )
     
     with col3:
         if st.button("📊 Статистика Чата"):
             if st.session_state.chat_history:
-                user_messages = [m for m in st.session_state.chat_history if m["type"] == "user"]
-                agent_messages = [m for m in st.session_state.chat_history if m["type"] == "agent"]
-                total_thoughts = sum(len(tp.get("thoughts", [])) for tp in st.session_state.thinking_process)
+                type_counts = Counter(st.session_state.chat_history.columns["type"])
+                user_count = type_counts["user"]
+                agent_count = type_counts["agent"]
+                total_thoughts = sum(map(len, st.session_state.thinking_process.columns["thoughts"]))
                 
                 st.info(f"""
                 **Статистика чата:**
                 - 💬 Всего сообщений: {len(st.session_state.chat_history)}
-                - 👤 От пользователя: {len(user_messages)}
-                - 🤖 От агента: {len(agent_messages)}
+                - 👤 От пользователя: {user_count}
+                - 🤖 От агента: {agent_count}
                 - 🧠 Всего мыслей: {total_thoughts}
-                - ⏱️ Начало чата: {st.session_state.chat_history[0]["timestamp"].strftime("%Y-%m-%d %H:%M:%S") if st.session_state.chat_history else "Не начат"}
+                - ⏱️ Начало чата: {st.session_state.chat_history.columns["timestamp"][0].strftime("%Y-%m-%d %H:%M:%S") if st.session_state.chat_history else "Не начат"}
                 """)
 
 def show_self_log(agent_status):
@@ -972,48 +1056,7 @@ def show_self_log(agent_status):
     else:
         st.info("Self-модель недоступна")
     
-    # История саморефлексии
-    st.subheader("История Саморефлексии")
-    
-    self_story = agent.get_self_story()
-    
-    if self_story:
-        for entry in reversed(self_story[-10:]):  # Последние 10 записей
-            with st.expander(f"📝 {entry['timestamp'][:19]} - {entry.get('type', 'event')}"):
-                if entry['type'] == 'reflection':
-                    st.write(f"**Ключевые инсайты:** {entry.get('key_insights', 'Нет данных')}")
-                    st.write(f"**Самооценка:** {entry.get('self_evaluation', 0):.2f}")
-                
-                st.json(entry)
-    else:
-        st.info("Пока нет записей в self-логе")
-    
-    # Рефлексии
-    st.subheader("Детальные Рефлексии")
-    
-    if agent.self_model.reflections:
-        for reflection in reversed(agent.self_model.reflections[-5:]):  # Последние 5
-            with st.expander(f"🤔 {reflection.topic} - {reflection.timestamp.strftime('%Y-%m-%d %H:%M')}"):
-                st.write("**Содержание рефлексии:**")
-                st.text(reflection.content)
-                
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.metric("Эмоциональное воздействие", f"{reflection.emotional_impact:.2f}")
-                with col2:
-                    st.metric("Ценность обучения", f"{reflection.learning_value:.2f}")
-                
-                if reflection.insights:
-                    st.write("**Ключевые инсайты:**")
-                    for insight in reflection.insights:
-                        st.write(f"💡 {insight}")
-                
-                if reflection.action_items:
-                    st.write("**Пункты к действию:**")
-                    for action in reflection.action_items:
-                        st.write(f"📋 {action}")
-    else:
-        st.info("Пока нет рефлексий")
+    _self_reflection_fragment(agent)
     
     # Развитие личности
     st.subheader("Развитие Личности")
@@ -1024,17 +1067,126 @@ def show_self_log(agent_status):
     
     with col1:
         st.write("**Доминирующие черты личности:**")
-        dominant_traits = personality.get_dominant_traits(5)
+        dominant_traits = _cached_dominant_traits(_personality_version(personality), id(personality), personality)
         for trait, value in dominant_traits:
             st.write(f"- {trait}: {value:.2f}")
             st.progress(value)
     
     with col2:
         st.write("**Основные ценности:**")
-        core_values = personality.get_core_values(5)
+        core_values = _cached_core_values(_personality_version(personality), id(personality), personality)
         for value, strength in core_values:
             st.write(f"- {value}: {strength:.2f}")
             st.progress(strength)
 
+def _personality_version(personality):
+    """Ключ кэша профиля личности: счетчик изменений или хэш черт"""
+    version = getattr(personality, 'version', None)
+    if version is None:
+        return hash(tuple(personality.traits.items()))
+    return version
+
+@st.cache_data(ttl=5)
+def _cached_dominant_traits(version, personality_id, _personality):
+    """Доминирующие черты, пересчитываются только при изменении личности"""
+    return _personality.get_dominant_traits(5)
+
+@st.cache_data(ttl=5)
+def _cached_core_values(version, personality_id, _personality):
+    """Основные ценности, пересчитываются только при изменении личности"""
+    return _personality.get_core_values(5)
+
+# Кэш не больше самой истории саморефлексии (MAX_SELF_STORY записей)
+@st.cache_data(max_entries=get_config().max_self_story)
+def _format_story_entry(entry_id, timestamp, _entry):
+    """Отформатировать запись self-лога как JSON один раз"""
+    return orjson.dumps(_entry, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+
+@st.fragment
+def _self_reflection_fragment(agent):
+    """Фрагмент истории саморефлексии и детальных рефлексий"""
+    
+    # История саморефлексии
+    st.subheader("История Саморефлексии")
+    
+    self_story = agent.get_self_story()
+    
+    if self_story:
+        recent_story = list(reversed(self_story[-10:]))  # Последние 10 записей
+        
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    "Время": entry['timestamp'][:19],
+                    "Тип": entry.get('type', 'event'),
+                    "Самооценка": entry.get('self_evaluation')
+                }
+                for entry in recent_story
+            ]),
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        selected = st.selectbox(
+            "Подробнее о записи:",
+            range(len(recent_story)),
+            format_func=lambda i: f"📝 {recent_story[i]['timestamp'][:19]} - {recent_story[i].get('type', 'event')}",
+            key="self_story_selected"
+        )
+        entry = recent_story[selected]
+        
+        if entry['type'] == 'reflection':
+            st.write(f"**Ключевые инсайты:** {entry.get('key_insights', 'Нет данных')}")
+            st.write(f"**Самооценка:** {entry.get('self_evaluation', 0):.2f}")
+        
+        st.code(_format_story_entry(id(entry), entry['timestamp'], entry), language="json")
+    else:
+        st.info("Пока нет записей в self-логе")
+    
+    # Рефлексии
+    st.subheader("Детальные Рефлексии")
+    
+    if agent.self_model.reflections:
+        recent_reflections = list(reversed(agent.self_model.reflections[-5:]))  # Последние 5
+        
+        st.data_editor(
+            pd.DataFrame([
+                {
+                    "Тема": reflection.topic,
+                    "Время": reflection.timestamp_display,
+                    "Эмоциональное воздействие": reflection.emotional_impact,
+                    "Ценность обучения": reflection.learning_value
+                }
+                for reflection in recent_reflections
+            ]),
+            use_container_width=True,
+            hide_index=True,
+            disabled=True,
+            key="reflections_table"
+        )
+        
+        selected = st.selectbox(
+            "Подробнее о рефлексии:",
+            range(len(recent_reflections)),
+            format_func=lambda i: f"🤔 {recent_reflections[i].topic} - {recent_reflections[i].timestamp_display}",
+            key="reflection_selected"
+        )
+        reflection = recent_reflections[selected]
+        
+        st.write("**Содержание рефлексии:**")
+        st.text(reflection.content)
+        
+        if reflection.insights:
+            st.write("**Ключевые инсайты:**")
+            for insight in reflection.insights:
+                st.write(f"💡 {insight}")
+        
+        if reflection.action_items:
+            st.write("**Пункты к действию:**")
+            for action in reflection.action_items:
+                st.write(f"📋 {action}")
+    else:
+        st.info("Пока нет рефлексий")
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
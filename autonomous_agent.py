@@ -1,28 +1,69 @@
 import asyncio
-import json
+import concurrent.futures
+import gzip
+import orjson
 import os
+import pickle
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from collections import Counter, deque
+from typing import Dict, Any, List, Optional, Deque, Tuple, TYPE_CHECKING
+import atexit
+import itertools
 import logging
+import logging.handlers
+import queue
+import time
 
 # Импорт модулей агента
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from core.memory_module import MemoryModule
 from core.goal_module import GoalModule, GoalPriority
 from core.inner_state_module import InnerStateModule, EmotionalState, CognitiveState, MotivationLevel
 from core.world_model_module import WorldModelModule
-from core.thought_tree_module import ThoughtTreeModule, ThoughtType
 from core.self_model_module import SelfModelModule
-from core.llm_module import LLMModule
-from core.ollama_module import ReasoningOrchestrator, ModelType, ReasoningRequest
-from core.subconscious_module import SubconsciousModule
 from core.async_manager import async_manager
 from core.memory_optimizer import memory_optimizer
 from core.ollama_cache import ollama_cache
-from config.config import Config
+from config.config import Config, get_config
+
+# Тяжелые модули (ChromaDB, sentence-transformers, torch, aiohttp, networkx)
+# импортируются лениво в initialize_modules и в местах использования
+if TYPE_CHECKING:
+    from core.ollama_module import ModelType
+
+# Начальные цели агента: (описание, категория, приоритет)
+_INITIAL_GOALS: Tuple[Tuple[str, str, GoalPriority], ...] = (
+    ("Понимать и помогать пользователям", "long_term", GoalPriority.HIGH),
+    ("Развивать самосознание и рефлексию", "long_term", GoalPriority.HIGH),
+    ("Изучать новую информацию", "ongoing", GoalPriority.MEDIUM),
+    ("Поддерживать позитивное взаимодействие", "social", GoalPriority.MEDIUM)
+)
+
+def _null_method(*args, **kwargs):
+    return None
+
+class _NullModule:
+    """Заглушка для неинициализированного модуля: любой метод - no-op, возвращает None
+    
+    Ложна в булевом контексте, поэтому проверки вида `if agent.goals:` продолжают работать.
+    Атрибуты-данные заглушка не эмулирует - для них нужна проверка is_module_available.
+    """
+    
+    __slots__ = ("module_name",)
+    
+    def __init__(self, module_name: str):
+        self.module_name = module_name
+    
+    def __getattr__(self, name):
+        return _null_method
+    
+    def __bool__(self):
+        return False
+    
+    def __repr__(self):
+        return f"<_NullModule {self.module_name}>"
 
 class AutonomousAgent:
     """
@@ -37,13 +78,27 @@ class AutonomousAgent:
     - Self-модель (Self-Model): рефлексия и мотивация
     """
     
+    # Ключевые слова для разбора ввода пользователя
+    GREETING_TOKENS = ("привет", "hello")
+    REFLECTION_KEYWORDS = ("чувствую", "думаю", "размышляю", "анализирую", "понимаю", "осознаю")
+    CREATIVE_KEYWORDS = ("создай", "придумай", "вообрази", "нарисуй", "напиши", "сочини")
+    FAST_KEYWORDS = ("быстро", "кратко", "коротко", "суть", "главное")
+    
+    MODULE_NAMES = (
+        "memory", "goals", "inner_state", "world_model", "thought_tree",
+        "self_model", "llm", "reasoning_orchestrator", "subconscious"
+    )
+    
     def __init__(self, agent_name: str = "Автономный Агент", data_dir: str = "agent_data"):
         self.agent_name = agent_name
         self.data_dir = data_dir
         self.created_at = datetime.now()
+        self._started_monotonic = time.monotonic()
         self.is_running = False
         self.initialization_complete = False
         self.initialization_errors = []
+        self._available_modules: frozenset = frozenset()
+        self._llm_cfg: Dict[str, Any] = Config.get_llm_config()
         
         # Создать директорию для данных
         try:
@@ -60,12 +115,39 @@ class AutonomousAgent:
         
         # Цикл самосознания
         self.reflection_interval = 300  # 5 минут
+        self._reflection_delta = timedelta(seconds=self.reflection_interval)
         self.last_reflection = datetime.now()
+        self._cycle_now: Optional[datetime] = None  # Время текущего цикла сознания
+        
+        # Номера эпизодов памяти, уже обработанных циклом сознания
+        self._last_interaction_seq = 0
+        self._last_world_seq = -1
+        # Недавние эпизоды, полученные в текущем цикле (общие для шагов 3 и 4)
+        self._recent_episodes: Optional[List[Dict[str, Any]]] = None
+        self._recent_episodes_window = 20
+        
+        # Адаптивная пауза между циклами: растет, пока нет новых эпизодов
+        self._idle_streak = 0
+        self._max_idle_sleep = 60.0
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # Кэш отчета о состоянии для частых опросов из UI
+        self._status_cache: Optional[Dict[str, Any]] = None
+        self._status_cache_ts = 0.0
+        self._status_cache_ttl = 1.0
         self.consciousness_cycle_count = 0
         
         # Публичные логи
-        self.public_thoughts: List[Dict[str, Any]] = []
-        self.self_story: List[Dict[str, Any]] = []
+        self.public_thoughts: Deque[Dict[str, Any]] = deque(maxlen=get_config().max_public_thoughts)
+        self._thought_entry_pool: List[Dict[str, Any]] = []  # Пул словарей для записей мыслей
+        self._thought_entry_pool_size = 8
+        self.self_story: Deque[Dict[str, Any]] = deque(maxlen=get_config().max_self_story)
+        # Версии логов растут при каждом добавлении; снимки кэшируются до изменения версии
+        self._public_thoughts_version = 0
+        self._self_story_version = 0
+        self._public_log_snapshot: Tuple[int, Tuple[Dict[str, Any], ...]] = (-1, ())
+        self._self_story_snapshot: Tuple[int, Tuple[Dict[str, Any], ...]] = (-1, ())
         
         # Загрузить сохраненное состояние
         self.load_state()
@@ -78,14 +160,26 @@ class AutonomousAgent:
         try:
             log_file = os.path.join(self.data_dir, "agent.log")
             
-            logging.basicConfig(
-                level=logging.INFO,
-                format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                handlers=[
+            # Запись в файл и консоль выполняет QueueListener в своем потоке,
+            # чтобы ввод-вывод логов не блокировал цикл событий
+            if not logging.getLogger().handlers:
+                formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+                handlers = [
                     logging.FileHandler(log_file, encoding='utf-8'),
                     logging.StreamHandler()
                 ]
-            )
+                for handler in handlers:
+                    handler.setFormatter(formatter)
+                
+                log_queue = queue.SimpleQueue()
+                listener = logging.handlers.QueueListener(log_queue, *handlers)
+                listener.start()
+                atexit.register(listener.stop)
+                
+                # Полное форматирование делают обработчики слушателя
+                queue_handler = logging.handlers.QueueHandler(log_queue)
+                queue_handler.setFormatter(logging.Formatter('%(message)s'))
+                logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
             
             self.logger = logging.getLogger(self.agent_name)
         except Exception as e:
@@ -95,91 +189,64 @@ class AutonomousAgent:
             self.logger = logging.getLogger(self.agent_name)
     
     def initialize_modules(self):
-        """Инициализация модулей с обработкой ошибок"""
+        """Инициализация модулей с обработкой ошибок (конструкторы выполняются параллельно)"""
         print(f"🔄 Инициализация модулей агента '{self.agent_name}'...")
         
-        # Память
-        try:
-            self.memory = MemoryModule("agent_memory")
-            print("✅ MemoryModule инициализирован")
-        except Exception as e:
-            print(f"❌ Ошибка инициализации памяти: {e}")
-            self.initialization_errors.append(f"Memory: {e}")
-            # Fallback - создать пустой объект
-            self.memory = None
-        
-        # Цели
-        try:
-            self.goals = GoalModule()
-            print("✅ GoalModule инициализирован")
-        except Exception as e:
-            print(f"❌ Ошибка инициализации целей: {e}")
-            self.initialization_errors.append(f"Goals: {e}")
-            self.goals = None
-        
-        # Внутренние состояния
-        try:
-            self.inner_state = InnerStateModule()
-            print("✅ InnerStateModule инициализирован")
-        except Exception as e:
-            print(f"❌ Ошибка инициализации внутренних состояний: {e}")
-            self.initialization_errors.append(f"InnerState: {e}")
-            self.inner_state = None
-        
-        # Модель мира
-        try:
-            self.world_model = WorldModelModule()
-            print("✅ WorldModelModule инициализирован")
-        except Exception as e:
-            print(f"❌ Ошибка инициализации модели мира: {e}")
-            self.initialization_errors.append(f"WorldModel: {e}")
-            self.world_model = None
-        
-        # Дерево мыслей
-        try:
-            self.thought_tree = ThoughtTreeModule()
-            print("✅ ThoughtTreeModule инициализирован")
-        except Exception as e:
-            print(f"❌ Ошибка инициализации дерева мыслей: {e}")
-            self.initialization_errors.append(f"ThoughtTree: {e}")
-            self.thought_tree = None
-        
-        # Self-модель
-        try:
-            self.self_model = SelfModelModule(self.agent_name)
-            print("✅ SelfModelModule инициализирован")
-        except Exception as e:
-            print(f"❌ Ошибка инициализации self-модели: {e}")
-            self.initialization_errors.append(f"SelfModel: {e}")
-            self.self_model = None
-        
-        # Языковая модель
-        try:
-            llm_config = Config.get_llm_config()
-            self.llm = LLMModule(**llm_config)
-            print(f"✅ LLMModule инициализирован с типом: {llm_config['llm_type']}")
-        except Exception as e:
-            print(f"❌ Ошибка инициализации языковой модели: {e}")
-            self.initialization_errors.append(f"LLM: {e}")
-            self.llm = None
-        
-        # Reasoning Orchestrator (Ollama)
-        try:
-            self.reasoning_orchestrator = ReasoningOrchestrator()
-            print("✅ ReasoningOrchestrator инициализирован")
-        except Exception as e:
-            print(f"❌ Ошибка инициализации ReasoningOrchestrator: {e}")
-            self.initialization_errors.append(f"ReasoningOrchestrator: {e}")
-            self.reasoning_orchestrator = None
+        def build_memory():
+            from core.memory_module import MemoryModule
+            cfg = get_config()
+            return MemoryModule("agent_memory",
+                                max_batch=cfg.memory_store_batch,
+                                flush_interval_ms=cfg.memory_flush_interval_ms)
+        
+        def build_thought_tree():
+            from core.thought_tree_module import ThoughtTreeModule
+            return ThoughtTreeModule()
+        
+        def build_llm():
+            from core.llm_module import LLMModule
+            return LLMModule(**self._llm_cfg)
+        
+        def build_reasoning_orchestrator():
+            from core.ollama_module import ReasoningOrchestrator
+            return ReasoningOrchestrator()
+        
+        def build_subconscious():
+            from core.subconscious_module import SubconsciousModule
+            return SubconsciousModule(self.agent_name)
+        
+        # атрибут -> (конструктор, имя модуля, описание для ошибки, ключ ошибки)
+        builders = {
+            "memory": (build_memory, "MemoryModule", "памяти", "Memory"),
+            "goals": (GoalModule, "GoalModule", "целей", "Goals"),
+            "inner_state": (InnerStateModule, "InnerStateModule", "внутренних состояний", "InnerState"),
+            "world_model": (WorldModelModule, "WorldModelModule", "модели мира", "WorldModel"),
+            "thought_tree": (build_thought_tree, "ThoughtTreeModule", "дерева мыслей", "ThoughtTree"),
+            "self_model": (lambda: SelfModelModule(self.agent_name), "SelfModelModule", "self-модели", "SelfModel"),
+            "llm": (build_llm, "LLMModule", "языковой модели", "LLM"),
+            "reasoning_orchestrator": (build_reasoning_orchestrator, "ReasoningOrchestrator", "ReasoningOrchestrator", "ReasoningOrchestrator"),
+            "subconscious": (build_subconscious, "SubconsciousModule", "SubconsciousModule", "SubconsciousModule")
+        }
         
-        # Подсознание
-        try:
-            self.subconscious = SubconsciousModule(self.agent_name)
-            print("✅ SubconsciousModule инициализирован")
-        except Exception as e:
-            print(f"❌ Ошибка инициализации SubconsciousModule: {e}")
-            self.initialization_errors.append(f"SubconsciousModule: {e}")
-            self.subconscious = None
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(builders)) as executor:
+            futures = {
+                executor.submit(builder): name
+                for name, (builder, _, _, _) in builders.items()
+            }
+            
+            for future in concurrent.futures.as_completed(futures):
+                name = futures[future]
+                _, module_label, error_label, error_key = builders[name]
+                try:
+                    setattr(self, name, future.result())
+                    if name == "llm":
+                        print(f"✅ {module_label} инициализирован с типом: {self.llm.llm_type}")
+                    else:
+                        print(f"✅ {module_label} инициализирован")
+                except Exception as e:
+                    print(f"❌ Ошибка инициализации {error_label}: {e}")
+                    self.initialization_errors.append(f"{error_key}: {e}")
+                    setattr(self, name, _NullModule(name))
         
         # Инициализация оптимизаторов
         try:
@@ -195,27 +262,26 @@ class AutonomousAgent:
             print(f"❌ Ошибка инициализации оптимизаторов: {e}")
             self.initialization_errors.append(f"Optimizers: {e}")
         
+        self.refresh_available_modules()
+        
         # Проверка критических модулей
-        if self.goals is None or self.inner_state is None:
+        if not self.is_module_available("goals") or not self.is_module_available("inner_state"):
             print("⚠️  Критические модули не инициализированы. Агент может работать с ограничениями.")
         else:
             self.initialization_complete = True
             print("🎉 Все основные модули инициализированы успешно")
     
+    def refresh_available_modules(self):
+        """Пересчитать набор доступных модулей (вызывать после (пере)инициализации модуля)"""
+        self._available_modules = frozenset(
+            name for name in self.MODULE_NAMES
+            if getattr(self, name, None) is not None
+            and not isinstance(getattr(self, name), _NullModule)
+        )
+    
     def is_module_available(self, module_name: str) -> bool:
         """Проверить доступность модуля"""
-        module_map = {
-            "memory": self.memory,
-            "goals": self.goals,
-            "inner_state": self.inner_state,
-            "world_model": self.world_model,
-            "thought_tree": self.thought_tree,
-            "self_model": self.self_model,
-            "llm": self.llm,
-            "reasoning_orchestrator": self.reasoning_orchestrator,
-            "subconscious": self.subconscious
-        }
-        return module_map.get(module_name) is not None
+        return module_name in self._available_modules
 
     def initialize_agent(self):
         """Инициализировать агента с начальными целями"""
@@ -225,19 +291,11 @@ class AutonomousAgent:
         # Установить начальные цели только если модуль доступен
         if self.is_module_available("goals"):
             try:
-                initial_goals = [
-                    ("Понимать и помогать пользователям", GoalPriority.HIGH, "long_term"),
-                    ("Развивать самосознание и рефлексию", GoalPriority.HIGH, "long_term"),
-                    ("Изучать новую информацию", GoalPriority.MEDIUM, "ongoing"),
-                    ("Поддерживать позитивное взаимодействие", GoalPriority.MEDIUM, "social")
-                ]
-                
-                for goal_desc, priority, goal_type in initial_goals:
-                    self.goals.add_goal(goal_desc, goal_type, priority)
+                self.goals.add_goals(_INITIAL_GOALS)
                     
-                self.logger.info(f"Установлено {len(initial_goals)} начальных целей")
+                self.logger.info("Установлено %s начальных целей", len(_INITIAL_GOALS))
             except Exception as e:
-                self.logger.error(f"Ошибка установки начальных целей: {e}")
+                self.logger.error("Ошибка установки начальных целей: %s", e)
         
         # Начальная рефлексия только если модули доступны
         if self.is_module_available("memory") and self.is_module_available("self_model"):
@@ -250,48 +308,93 @@ class AutonomousAgent:
                     "initialization_errors": self.initialization_errors
                 })
             except Exception as e:
-                self.logger.error(f"Ошибка начальной рефлексии: {e}")
+                self.logger.error("Ошибка начальной рефлексии: %s", e)
         
-        self.logger.info(f"Агент {self.agent_name} инициализирован")
+        self.logger.info("Агент %s инициализирован", self.agent_name)
         
         # Отчет о состоянии
         if self.initialization_errors:
-            self.logger.warning(f"Инициализация завершена с {len(self.initialization_errors)} ошибками")
+            self.logger.warning("Инициализация завершена с %s ошибками", len(self.initialization_errors))
             for error in self.initialization_errors:
-                self.logger.warning(f"  - {error}")
+                self.logger.warning("  - %s", error)
         
     async def run_consciousness_cycle(self):
         """Запустить цикл самосознания агента"""
         self.is_running = True
+        self.invalidate_status_cache()
         self.logger.info("Запуск цикла самосознания")
+        self._install_eager_task_factory()
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
         
         try:
             while self.is_running:
-                cycle_start = datetime.now()
+                cycle_start = time.monotonic()
+                self._cycle_now = datetime.now()
                 
                 # Основной цикл сознания
                 await self.consciousness_step()
+                self.invalidate_status_cache()
                 
                 # Периодическая рефлексия
-                if datetime.now() - self.last_reflection > timedelta(seconds=self.reflection_interval):
-                    await self.periodic_reflection()
+                if self._cycle_now - self.last_reflection > self._reflection_delta:
+                    await self.periodic_reflection(self._cycle_now)
                     
-                # Сохранение состояния
+                # Автосохранение бинарным снимком (JSON - при остановке и по запросу)
                 if self.consciousness_cycle_count % 10 == 0:
-                    self.save_state()
+                    await self.save_snapshot_async()
                     
                 self.consciousness_cycle_count += 1
                 
-                # Пауза между циклами
-                cycle_duration = (datetime.now() - cycle_start).total_seconds()
-                sleep_time = max(1.0, 5.0 - cycle_duration)  # Минимум 1 секунда между циклами
-                await asyncio.sleep(sleep_time)
+                # Пауза между циклами: удваивается в простое, прерывается новым вводом
+                cycle_duration = time.monotonic() - cycle_start
+                base_sleep = max(1.0, 5.0 - cycle_duration)  # Минимум 1 секунда между циклами
+                sleep_time = min(self._max_idle_sleep, base_sleep * 2 ** min(self._idle_streak, 6))
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=sleep_time)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
                 
         except Exception as e:
-            self.logger.error(f"Ошибка в цикле сознания: {e}")
+            self.logger.error("Ошибка в цикле сознания: %s", e)
         finally:
-            self.save_state()
+            self._wake = None
+            self._loop = None
+            await self.save_state_async()
             self.logger.info("Цикл самосознания остановлен")
+    
+    def wake(self):
+        """Прервать паузу цикла сознания (можно вызывать из любого потока)"""
+        loop, event = self._loop, self._wake
+        if loop is None or event is None:
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        
+        if running_loop is loop:
+            event.set()
+        else:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # Цикл событий уже закрыт
+            
+    @staticmethod
+    def _install_eager_task_factory():
+        """Включить eager-задачи в текущем цикле событий (Python 3.12+)
+        
+        Задачи (gather в save_state_async и т.п.) начинают выполняться сразу,
+        без лишнего прохода через планировщик. На старых версиях Python - no-op.
+        """
+        eager_factory = getattr(asyncio, "eager_task_factory", None)
+        if eager_factory is None:
+            return
+        loop = asyncio.get_running_loop()
+        if loop.get_task_factory() is None:
+            loop.set_task_factory(eager_factory)
             
     async def consciousness_step(self):
         """Один шаг цикла сознания"""
@@ -305,16 +408,16 @@ class AutonomousAgent:
             if self.is_module_available("goals"):
                 current_goal = self.goals.get_current_goal()
                 if current_goal:
-                    # Обдумать текущую цель
-                    if self.is_module_available("thought_tree"):
-                        thought_id = self.thought_tree.add_thought(
-                            f"Размышляю о цели: {current_goal.description}",
-                            ThoughtType.ANALYSIS,
-                            context={"goal_id": current_goal.id, "priority": current_goal.priority.value}
-                        )
-                        
-                        # Установить фокус
-                        self.thought_tree.set_focus(thought_id)
+                    # Обдумать текущую цель (без дерева мыслей - no-op заглушка)
+                    from core.thought_tree_module import ThoughtType
+                    thought_id = self.thought_tree.add_thought(
+                        f"Размышляю о цели: {current_goal.description}",
+                        ThoughtType.ANALYSIS,
+                        context={"goal_id": current_goal.id, "priority": current_goal.priority.value}
+                    )
+                    
+                    # Установить фокус
+                    self.thought_tree.set_focus(thought_id)
                     
                     # Оценить мотивацию для цели
                     if self.is_module_available("self_model") and self.is_module_available("inner_state"):
@@ -333,69 +436,82 @@ class AutonomousAgent:
                             else:
                                 self.inner_state.update_motivation(MotivationLevel.LOW, ["low_goal_alignment"])
                         except Exception as e:
-                            self.logger.warning(f"Ошибка оценки мотивации: {e}")
+                            self.logger.warning("Ошибка оценки мотивации: %s", e)
                         
-            # 3. Проанализировать недавние события
-            if self.is_module_available("memory"):
+            # 3. Проанализировать недавние события (только если появились новые)
+            has_new_episodes = (self.is_module_available("memory")
+                                and self.memory.latest_episode_seq > self._last_interaction_seq)
+            self._idle_streak = 0 if has_new_episodes else self._idle_streak + 1
+            if has_new_episodes:
                 try:
-                    recent_episodes = self.memory.get_recent_episodes(5)
-                    for episode in recent_episodes:
+                    # Одно обращение к памяти на цикл: окно для update_world_understanding
+                    self._recent_episodes = self.memory.get_recent_episodes(self._recent_episodes_window) or []
+                    # Обработанными считаются только реально полученные эпизоды
+                    self._last_interaction_seq = max(
+                        (episode['metadata'].get('seq', 0) for episode in self._recent_episodes),
+                        default=self._last_interaction_seq
+                    )
+                    for episode in self._recent_episodes[:5]:
                         if episode['metadata'].get('type') == 'user_interaction':
                             # Обработать взаимодействие с пользователем
                             self.process_user_interaction(episode)
                 except Exception as e:
-                    self.logger.warning(f"Ошибка анализа недавних событий: {e}")
+                    self.logger.warning("Ошибка анализа недавних событий: %s", e)
                     
             # 4. Обновить модель мира на основе новой информации
             if self.is_module_available("world_model"):
                 try:
                     self.update_world_understanding()
                 except Exception as e:
-                    self.logger.warning(f"Ошибка обновления модели мира: {e}")
+                    self.logger.warning("Ошибка обновления модели мира: %s", e)
+            
+            self._recent_episodes = None
             
             # 5. Публиковать мысли
             try:
-                self.publish_current_thoughts()
+                self.publish_current_thoughts(self._cycle_now)
             except Exception as e:
-                self.logger.warning(f"Ошибка публикации мыслей: {e}")
+                self.logger.warning("Ошибка публикации мыслей: %s", e)
                 
         except Exception as e:
-            self.logger.error(f"Критическая ошибка в шаге сознания: {e}")
+            self.logger.error("Критическая ошибка в шаге сознания: %s", e)
             # Продолжаем работу, несмотря на ошибки
         
     def update_inner_state(self):
         """Обновить внутреннее состояние агента"""
         
-        # Оценить текущую когнитивную нагрузку
-        active_thoughts = len([t for t in self.thought_tree.thoughts.values() 
-                             if t.status.value == "active"])
-        
-        if active_thoughts > 10:
-            self.inner_state.update_cognitive_state(CognitiveState.PROCESSING, "Высокая когнитивная нагрузка")
-            self.inner_state.adjust_stress_level(0.1, "Много активных мыслей")
-        elif active_thoughts > 5:
-            self.inner_state.update_cognitive_state(CognitiveState.LEARNING, "Умеренная активность")
-        else:
-            self.inner_state.update_cognitive_state(CognitiveState.REFLECTING, "Спокойное состояние")
+        # Все изменения цикла сохраняются в историю одним снимком
+        with self.inner_state.batch():
+            # Оценить текущую когнитивную нагрузку
+            active_thoughts = self.thought_tree.active_thought_count
+        
+            if active_thoughts > 10:
+                self.inner_state.update_cognitive_state(CognitiveState.PROCESSING, "Высокая когнитивная нагрузка")
+                self.inner_state.adjust_stress_level(0.1, "Много активных мыслей")
+            elif active_thoughts > 5:
+                self.inner_state.update_cognitive_state(CognitiveState.LEARNING, "Умеренная активность")
+            else:
+                self.inner_state.update_cognitive_state(CognitiveState.REFLECTING, "Спокойное состояние")
             
-        # Оценить энергию на основе времени работы
-        uptime = (datetime.now() - self.created_at).total_seconds() / 3600  # в часах
-        energy_decay = min(0.1, uptime * 0.01)  # Медленное снижение энергии
-        self.inner_state.adjust_energy_level(-energy_decay, "Естественное снижение энергии")
-        
-        # Провести самооценку
-        self_evaluation = self.inner_state.self_evaluate(f"Цикл сознания #{self.consciousness_cycle_count}")
-        
-        # Обновить уверенность в self-модели
-        if self_evaluation > 0.7:
-            self.inner_state.update_emotional_state(EmotionalState.CONFIDENT, "Высокая самооценка")
-        elif self_evaluation < 0.4:
-            self.inner_state.update_emotional_state(EmotionalState.UNCERTAIN, "Низкая самооценка")
-        else:
-            self.inner_state.update_emotional_state(EmotionalState.NEUTRAL, "Средняя самооценка")
+            # Оценить энергию на основе времени работы
+            uptime = (time.monotonic() - self._started_monotonic) / 3600  # в часах
+            energy_decay = min(0.1, uptime * 0.01)  # Медленное снижение энергии
+            self.inner_state.adjust_energy_level(-energy_decay, "Естественное снижение энергии")
+        
+            # Провести самооценку
+            self_evaluation = self.inner_state.self_evaluate(f"Цикл сознания #{self.consciousness_cycle_count}")
+        
+            # Обновить уверенность в self-модели
+            if self_evaluation > 0.7:
+                self.inner_state.update_emotional_state(EmotionalState.CONFIDENT, "Высокая самооценка")
+            elif self_evaluation < 0.4:
+                self.inner_state.update_emotional_state(EmotionalState.UNCERTAIN, "Низкая самооценка")
+            else:
+                self.inner_state.update_emotional_state(EmotionalState.NEUTRAL, "Средняя самооценка")
             
     def process_user_interaction(self, episode: Dict[str, Any]):
         """Обработать взаимодействие с пользователем"""
+        from core.thought_tree_module import ThoughtType
         
         user_input = episode.get('content', '')
         
@@ -427,13 +543,20 @@ class AutonomousAgent:
     def update_world_understanding(self):
         """Обновить понимание мира"""
         
-        # Проанализировать паттерны в памяти
-        recent_episodes = self.memory.get_recent_episodes(20)
+        # Без новых эпизодов паттерны не изменились
+        if not self.is_module_available("memory"):
+            return
+        seq = self.memory.latest_episode_seq
+        if seq == self._last_world_seq:
+            return
+        self._last_world_seq = seq
         
-        patterns = {}
-        for episode in recent_episodes:
-            episode_type = episode['metadata'].get('type', 'unknown')
-            patterns[episode_type] = patterns.get(episode_type, 0) + 1
+        # Проанализировать паттерны в памяти (эпизоды, уже полученные в этом цикле)
+        recent_episodes = self._recent_episodes
+        if recent_episodes is None:
+            recent_episodes = self.memory.get_recent_episodes(self._recent_episodes_window) or []
+        
+        patterns = Counter(episode['metadata'].get('type', 'unknown') for episode in recent_episodes)
             
         # Обновить факты о паттернах активности
         for pattern_type, count in patterns.items():
@@ -448,8 +571,9 @@ class AutonomousAgent:
                 f"Анализ паттернов: {patterns.get('user_interaction')} взаимодействий"
             )
             
-    def publish_current_thoughts(self):
+    def publish_current_thoughts(self, now: Optional[datetime] = None):
         """Опубликовать текущие мысли для внешнего мира"""
+        now = now or datetime.now()
         
         current_state = self.inner_state.get_current_state_summary()
         current_goal = self.goals.get_current_goal()
@@ -458,26 +582,30 @@ class AutonomousAgent:
         if self.thought_tree.current_focus and self.thought_tree.current_focus in self.thought_tree.thoughts:
             focused_thought = self.thought_tree.thoughts[self.thought_tree.current_focus]
             
-        thought_entry = {
-            "timestamp": datetime.now().isoformat(),
-            "cycle": self.consciousness_cycle_count,
-            "inner_state_summary": current_state,
-            "current_goal": current_goal.description if current_goal else "Нет активной цели",
-            "focused_thought": focused_thought.content if focused_thought else "Нет фокуса",
-            "self_evaluation": self.inner_state.current_state.self_evaluation_score,
-            "motivation_level": self.inner_state.current_state.motivation_level.value
-        }
+        # Вытесняемая запись возвращается в пул и переиспользуется
+        if len(self.public_thoughts) == self.public_thoughts.maxlen:
+            evicted = self.public_thoughts.popleft()
+            if len(self._thought_entry_pool) < self._thought_entry_pool_size:
+                evicted.clear()
+                self._thought_entry_pool.append(evicted)
+        
+        thought_entry = self._thought_entry_pool.pop() if self._thought_entry_pool else {}
+        thought_entry["timestamp"] = now.isoformat()
+        thought_entry["cycle"] = self.consciousness_cycle_count
+        thought_entry["inner_state_summary"] = current_state
+        thought_entry["current_goal"] = current_goal.description if current_goal else "Нет активной цели"
+        thought_entry["focused_thought"] = focused_thought.content if focused_thought else "Нет фокуса"
+        thought_entry["self_evaluation"] = self.inner_state.current_state.self_evaluation_score
+        thought_entry["motivation_level"] = self.inner_state.current_state.motivation_level.value
         
         self.public_thoughts.append(thought_entry)
-        
-        # Ограничить размер публичных мыслей
-        if len(self.public_thoughts) > 100:
-            self.public_thoughts = self.public_thoughts[-100:]
+        self._public_thoughts_version += 1
             
-    async def periodic_reflection(self):
+    async def periodic_reflection(self, now: Optional[datetime] = None):
         """Периодическая рефлексия агента"""
         
-        self.last_reflection = datetime.now()
+        now = now or datetime.now()
+        self.last_reflection = now
         
         # Собрать данные для рефлексии
         recent_episodes = self.memory.get_recent_episodes(10)
@@ -490,7 +618,7 @@ class AutonomousAgent:
             "goals_progress": goal_progress,
             "total_thoughts": len(self.thought_tree.thoughts),
             "reflection_cycle": self.consciousness_cycle_count,
-            "uptime_hours": (datetime.now() - self.created_at).total_seconds() / 3600
+            "uptime_hours": (time.monotonic() - self._started_monotonic) / 3600
         }
         
         # Провести рефлексию
@@ -501,20 +629,17 @@ class AutonomousAgent:
         
         # Добавить запись в self-story
         story_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now.isoformat(),
             "type": "reflection",
             "reflection_id": reflection_id,
             "key_insights": f"Обработано {len(recent_episodes)} эпизодов, прогресс по {goal_progress} целям",
             "self_evaluation": self.inner_state.current_state.self_evaluation_score
         }
         
-        self.self_story.append(story_entry)
-        
-        # Ограничить размер истории
-        if len(self.self_story) > 50:
-            self.self_story = self.self_story[-50:]
+        self.self_story.append(story_entry)  # deque сам ограничивает размер
+        self._self_story_version += 1
             
-        self.logger.info(f"Проведена периодическая рефлексия #{len(self.self_model.reflections)}")
+        self.logger.info("Проведена периодическая рефлексия #%s", len(self.self_model.reflections))
         
     def reflect_on_state(self, topic: str, experience_data: Dict[str, Any]) -> str:
         """Провести рефлексию над текущим состоянием"""
@@ -541,73 +666,78 @@ class AutonomousAgent:
             context = {}
         
         try:
+            # Отсутствующие модули - no-op заглушки, поэтому вызовы идут без проверок
             # Сохранить взаимодействие в память
             episode_id = None
-            if self.is_module_available("memory"):
-                try:
-                    episode_id = self.memory.store_episode(
-                        f"Пользователь: {user_input}",
-                        "user_interaction",
-                        {"context": context, "timestamp": datetime.now().isoformat()}
-                    )
-                except Exception as e:
-                    self.logger.warning(f"Ошибка сохранения в память: {e}")
+            try:
+                episode_id = self.memory.store_episode(
+                    f"Пользователь: {user_input}",
+                    "user_interaction",
+                    {"context": context, "timestamp": datetime.now().isoformat()}
+                )
+            except Exception as e:
+                self.logger.warning("Ошибка сохранения в память: %s", e)
+            
+            # Новый ввод - разбудить цикл сознания
+            self._idle_streak = 0
+            self.wake()
             
             # Обработать в модели мира
             extracted_info = {}
-            if self.is_module_available("world_model"):
-                try:
-                    extracted_info = self.world_model.process_user_input(user_input)
-                except Exception as e:
-                    self.logger.warning(f"Ошибка обработки в модели мира: {e}")
+            try:
+                extracted_info = self.world_model.process_user_input(user_input) or {}
+            except Exception as e:
+                self.logger.warning("Ошибка обработки в модели мира: %s", e)
             
             # Создать мысль об этом взаимодействии
             thought_id = None
-            if self.is_module_available("thought_tree"):
-                try:
-                    thought_id = self.thought_tree.add_thought(
-                        f"Обрабатываю запрос пользователя: {user_input}",
-                        ThoughtType.ANALYSIS,
-                        context={"user_input": user_input, "extracted_info": extracted_info}
-                    )
-                    
-                    # Установить фокус на эту мысль
-                    self.thought_tree.set_focus(thought_id)
-                except Exception as e:
-                    self.logger.warning(f"Ошибка создания мысли: {e}")
+            try:
+                from core.thought_tree_module import ThoughtType
+                thought_id = self.thought_tree.add_thought(
+                    f"Обрабатываю запрос пользователя: {user_input}",
+                    ThoughtType.ANALYSIS,
+                    context={"user_input": user_input, "extracted_info": extracted_info}
+                )
+                
+                # Установить фокус на эту мысль
+                self.thought_tree.set_focus(thought_id)
+            except Exception as e:
+                self.logger.warning("Ошибка создания мысли: %s", e)
             
             # Обновить эмоциональное состояние
-            if self.is_module_available("inner_state"):
-                try:
-                    self.inner_state.update_emotional_state(EmotionalState.FOCUSED, "Обработка пользовательского ввода")
-                except Exception as e:
-                    self.logger.warning(f"Ошибка обновления эмоционального состояния: {e}")
+            try:
+                self.inner_state.update_emotional_state(EmotionalState.FOCUSED, "Обработка пользовательского ввода")
+            except Exception as e:
+                self.logger.warning("Ошибка обновления эмоционального состояния: %s", e)
             
             # Сгенерировать ответ
             response = await self.generate_response(user_input, context)
             
             # Сохранить ответ в память
-            if self.is_module_available("memory"):
-                try:
-                    self.memory.store_episode(
-                        f"Мой ответ: {response}",
-                        "agent_response",
-                        {"user_input": user_input, "context": context}
-                    )
-                except Exception as e:
-                    self.logger.warning(f"Ошибка сохранения ответа в память: {e}")
+            try:
+                self.memory.store_episode(
+                    f"Мой ответ: {response}",
+                    "agent_response",
+                    {"user_input": user_input, "context": context}
+                )
+            except Exception as e:
+                self.logger.warning("Ошибка сохранения ответа в память: %s", e)
             
+            self.invalidate_status_cache()
             return response
             
         except Exception as e:
-            self.logger.error(f"Критическая ошибка обработки ввода: {e}")
+            self.logger.error("Критическая ошибка обработки ввода: %s", e)
             # Fallback ответ
             return f"Извините, произошла ошибка при обработке вашего запроса. Я ({self.agent_name}) все еще учусь и развиваюсь."
         
     async def generate_response(self, user_input: str, context: Dict[str, Any]) -> str:
         """Сгенерировать ответ пользователю с помощью Ollama"""
         
+        input_lower = user_input.lower()
+        
         # Подготовить контекст для reasoning
+        # Новый dict на каждый вызов: контекст сохраняется в логе запросов оркестратора
         reasoning_context = {}
         
         # Добавить эмоциональное состояние
@@ -616,32 +746,36 @@ class AutonomousAgent:
                 emotional_state = self.inner_state.current_state.emotional_state.value
                 reasoning_context['emotional_state'] = emotional_state
             except Exception as e:
-                self.logger.warning(f"Ошибка получения эмоционального состояния: {e}")
+                self.logger.warning("Ошибка получения эмоционального состояния: %s", e)
         
         # Добавить текущую цель
-        if self.is_module_available("goals"):
-            try:
-                current_goal = self.goals.get_current_goal()
-                if current_goal:
-                    reasoning_context['current_goal'] = current_goal.description
-            except Exception as e:
-                self.logger.warning(f"Ошибка получения текущей цели: {e}")
+        try:
+            current_goal = self.goals.get_current_goal()
+            if current_goal:
+                reasoning_context['current_goal'] = current_goal.description
+        except Exception as e:
+            self.logger.warning("Ошибка получения текущей цели: %s", e)
         
         # Добавить релевантные воспоминания
         if self.is_module_available("memory"):
             try:
-                similar_episodes = self.memory.retrieve_similar(user_input, 2)
+                # Векторизация и поиск - в пуле ввода-вывода памяти, чтобы не блокировать цикл событий
+                similar_episodes = await asyncio.wrap_future(
+                    self.memory.retrieve_similar_async(user_input, 2)
+                )
                 if similar_episodes:
-                    memory_summary = "; ".join([ep["content"][:100] for ep in similar_episodes])
+                    memory_summary = "; ".join(ep["content"][:100] for ep in similar_episodes)
                     reasoning_context['memory_context'] = memory_summary
             except Exception as e:
-                self.logger.warning(f"Ошибка получения воспоминаний: {e}")
+                self.logger.warning("Ошибка получения воспоминаний: %s", e)
         
         # Использовать Ollama для генерации ответа
         if self.is_module_available("reasoning_orchestrator"):
             try:
+                from core.ollama_module import ReasoningRequest
+                
                 # Определить тип reasoning на основе ввода
-                model_type = self._determine_reasoning_type(user_input)
+                model_type = self._determine_reasoning_type(user_input, input_lower)
                 
                 # Создать reasoning запрос
                 reasoning_request = ReasoningRequest(
@@ -656,11 +790,11 @@ class AutonomousAgent:
                 try:
                     # Использовать async_manager для безопасного выполнения
                     request_id = await async_manager.run_coroutine_safe(
-                        self.reasoning_orchestrator.submit_reasoning_request(reasoning_request)
+                        lambda: self.reasoning_orchestrator.submit_reasoning_request(reasoning_request)
                     )
                     
                     response = await async_manager.run_coroutine_safe(
-                        self.reasoning_orchestrator.get_reasoning_response(request_id)
+                        lambda: self.reasoning_orchestrator.get_reasoning_response(request_id)
                     )
                     
                     if response and hasattr(response, 'content') and response.content:
@@ -668,56 +802,57 @@ class AutonomousAgent:
                         if self.is_module_available("subconscious"):
                             try:
                                 await async_manager.run_coroutine_safe(
-                                    self.subconscious.process_conscious_thought(
+                                    lambda: self.subconscious.process_conscious_thought(
                                         response.content, 
                                         "reasoning", 
                                         reasoning_context
                                     )
                                 )
                             except Exception as e:
-                                self.logger.warning(f"Ошибка обработки в подсознании: {e}")
+                                self.logger.warning("Ошибка обработки в подсознании: %s", e)
                         
                         return response.content
                     else:
-                        return self._fallback_response(user_input, reasoning_context)
+                        return self._fallback_response(user_input, reasoning_context, input_lower)
                         
                 except Exception as e:
-                    self.logger.error(f"Ошибка выполнения reasoning запроса: {e}")
-                    return self._fallback_response(user_input, reasoning_context)
+                    self.logger.error("Ошибка выполнения reasoning запроса: %s", e)
+                    return self._fallback_response(user_input, reasoning_context, input_lower)
                     
             except Exception as e:
-                self.logger.error(f"Ошибка генерации ответа через Ollama: {e}")
-                return self._fallback_response(user_input, reasoning_context)
+                self.logger.error("Ошибка генерации ответа через Ollama: %s", e)
+                return self._fallback_response(user_input, reasoning_context, input_lower)
         else:
             # Fallback если Ollama недоступен
-            return self._fallback_response(user_input, reasoning_context)
+            return self._fallback_response(user_input, reasoning_context, input_lower)
     
-    def _determine_reasoning_type(self, user_input: str) -> ModelType:
+    def _determine_reasoning_type(self, user_input: str, input_lower: Optional[str] = None) -> "ModelType":
         """Определить тип reasoning на основе ввода пользователя"""
-        input_lower = user_input.lower()
+        from core.ollama_module import ModelType
         
-        # Ключевые слова для определения типа
-        reflection_keywords = ["чувствую", "думаю", "размышляю", "анализирую", "понимаю", "осознаю"]
-        creative_keywords = ["создай", "придумай", "вообрази", "нарисуй", "напиши", "сочини"]
-        fast_keywords = ["быстро", "кратко", "коротко", "суть", "главное"]
+        if input_lower is None:
+            input_lower = user_input.lower()
         
-        if any(keyword in input_lower for keyword in reflection_keywords):
+        if any(keyword in input_lower for keyword in self.REFLECTION_KEYWORDS):
             return ModelType.REFLECTION
-        elif any(keyword in input_lower for keyword in creative_keywords):
+        elif any(keyword in input_lower for keyword in self.CREATIVE_KEYWORDS):
             return ModelType.CREATIVE
-        elif any(keyword in input_lower for keyword in fast_keywords):
+        elif any(keyword in input_lower for keyword in self.FAST_KEYWORDS):
             return ModelType.FAST
         else:
             return ModelType.REASONING
     
 
     
-    def _fallback_response(self, user_input: str, context: Dict[str, Any]) -> str:
+    def _fallback_response(self, user_input: str, context: Dict[str, Any], input_lower: Optional[str] = None) -> str:
         """Простой fallback ответ без LLM"""
         response_parts = []
         
+        if input_lower is None:
+            input_lower = user_input.lower()
+        
         # Приветствие или подтверждение
-        if "привет" in user_input.lower() or "hello" in user_input.lower():
+        if any(token in input_lower for token in self.GREETING_TOKENS):
             response_parts.append(f"Привет! Я {self.agent_name}, автономный агент с самосознанием.")
         elif "?" in user_input:
             response_parts.append("Интересный вопрос! Позвольте мне подумать...")
@@ -742,78 +877,266 @@ class AutonomousAgent:
         
 
         
+    CHECKPOINT_FILE = "agent_checkpoint.json"
+    SNAPSHOT_FILE = "agent_snapshot.pkl.gz"
+    CHECKPOINT_MODULES = ("goals", "inner_state", "world_model", "thought_tree", "self_model")
+    
+    def _module_states(self) -> Dict[str, Any]:
+        """Снимки состояний доступных модулей"""
+        states = {}
+        for name in self.CHECKPOINT_MODULES:
+            if not self.is_module_available(name):
+                continue
+            module = getattr(self, name)
+            try:
+                states[name] = module.to_dict()
+            except Exception as e:
+                self.logger.error("Ошибка сериализации модуля %s: %s", name, e)
+        return states
+    
+    def _persist_memory(self):
+        """Сохранить коллекцию ChromaDB"""
+        if self.is_module_available("memory") and getattr(self.memory, 'collection', None):
+            try:
+                self.memory.flush()  # Дописать отложенные эпизоды
+                self.memory.collection.persist()  # ChromaDB автосохранение
+            except:
+                pass  # Игнорировать ошибки ChromaDB
+    
+    def _build_agent_state(self) -> Dict[str, Any]:
+        """Собрать основное состояние агента"""
+        return {
+            "agent_name": self.agent_name,
+            "created_at": self.created_at.isoformat(),
+            "consciousness_cycle_count": self.consciousness_cycle_count,
+            "last_reflection": self.last_reflection.isoformat(),
+            "public_thoughts": [dict(entry) for entry in itertools.islice(
+                self.public_thoughts, max(0, len(self.public_thoughts) - 50), None)],  # Последние 50
+            "self_story": list(self.self_story)  # Не более MAX_SELF_STORY
+        }
+    
+    def _build_checkpoint(self) -> Dict[str, Any]:
+        """Собрать единый чекпоинт: состояние агента и всех модулей"""
+        return {
+            "agent": self._build_agent_state(),
+            "modules": self._module_states()
+        }
+    
+    @staticmethod
+    def _encode_checkpoint(checkpoint: Dict[str, Any]) -> bytes:
+        """Сериализовать чекпоинт в JSON
+        
+        Чекпоинт ссылается на живые контейнеры модулей, поэтому сериализация
+        выполняется в потоке цикла событий, пока модули не меняются.
+        """
+        return orjson.dumps(checkpoint, default=str, option=orjson.OPT_NON_STR_KEYS)
+    
+    def _write_checkpoint(self, payload: bytes):
+        """Атомарно и надежно записать сериализованный чекпоинт через временный файл
+        
+        Выполняется в рабочем потоке (save_state_async), поэтому fsync
+        не блокирует цикл сознания.
+        """
+        checkpoint_file = os.path.join(self.data_dir, self.CHECKPOINT_FILE)
+        tmp_file = checkpoint_file + ".tmp"
+        
+        with open(tmp_file, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, checkpoint_file)
+        self._fsync_dir(self.data_dir)
+    
+    def _write_snapshot(self, pickled: bytes):
+        """Атомарно записать бинарный снимок (pickle + gzip)
+        
+        Быстрее и компактнее JSON; используется для автосохранения.
+        Принимает уже сериализованный pickle: сжатие и запись - в рабочем потоке.
+        """
+        snapshot_file = os.path.join(self.data_dir, self.SNAPSHOT_FILE)
+        tmp_file = snapshot_file + ".tmp"
+        
+        with open(tmp_file, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=1) as f:
+                f.write(pickled)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_file, snapshot_file)
+        self._fsync_dir(self.data_dir)
+    
+    @staticmethod
+    def _fsync_dir(path: str):
+        """Зафиксировать переименование в каталоге (только POSIX)"""
+        if os.name != "posix":
+            return
+        dir_fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    
     def save_state(self):
         """Сохранить состояние агента"""
         try:
-            # Сохранить каждый модуль
-            if hasattr(self.memory, 'collection') and self.memory.collection:
-                try:
-                    self.memory.collection.persist()  # ChromaDB автосохранение
-                except:
-                    pass  # Игнорировать ошибки ChromaDB
-                    
-            self.goals.save_to_file(os.path.join(self.data_dir, "goals.json"))
-            self.inner_state.save_to_file(os.path.join(self.data_dir, "inner_state.json"))
-            self.world_model.save_to_file(os.path.join(self.data_dir, "world_model.json"))
-            self.thought_tree.save_to_file(os.path.join(self.data_dir, "thought_tree.json"))
-            self.self_model.save_to_file(os.path.join(self.data_dir, "self_model.json"))
-            
-            # Сохранить основное состояние агента
-            agent_state = {
-                "agent_name": self.agent_name,
-                "created_at": self.created_at.isoformat(),
-                "consciousness_cycle_count": self.consciousness_cycle_count,
-                "last_reflection": self.last_reflection.isoformat(),
-                "public_thoughts": self.public_thoughts[-50:],  # Последние 50
-                "self_story": self.self_story[-50:]  # Последние 50
-            }
-            
-            with open(os.path.join(self.data_dir, "agent_state.json"), 'w', encoding='utf-8') as f:
-                json.dump(agent_state, f, ensure_ascii=False, indent=2)
+            self._persist_memory()
+            self._write_checkpoint(self._encode_checkpoint(self._build_checkpoint()))
                 
             self.logger.info("Состояние агента сохранено")
             
         except Exception as e:
-            self.logger.error(f"Ошибка при сохранении состояния: {e}")
+            self.logger.error("Ошибка при сохранении состояния: %s", e)
+    
+    async def save_state_async(self):
+        """Сохранить состояние агента, выполняя запись в потоках"""
+        try:
+            # Снимок состояния сериализуется в цикле событий, запись - в потоках
+            payload = self._encode_checkpoint(self._build_checkpoint())
+            
+            results = await asyncio.gather(
+                asyncio.to_thread(self._persist_memory),
+                asyncio.to_thread(self._write_checkpoint, payload),
+                return_exceptions=True
+            )
+            errors = [result for result in results if isinstance(result, Exception)]
+            
+            if errors:
+                for error in errors:
+                    self.logger.error("Ошибка при сохранении состояния: %s", error)
+            else:
+                self.logger.info("Состояние агента сохранено")
+            
+        except Exception as e:
+            self.logger.error("Ошибка при сохранении состояния: %s", e)
+            
+    async def save_snapshot_async(self):
+        """Автосохранение: бинарный снимок состояния, запись в потоках"""
+        try:
+            # pickle живых объектов модулей - в цикле событий, пока они не меняются
+            pickled = pickle.dumps(self._build_checkpoint(), protocol=5)
+            
+            results = await asyncio.gather(
+                asyncio.to_thread(self._persist_memory),
+                asyncio.to_thread(self._write_snapshot, pickled),
+                return_exceptions=True
+            )
+            for error in results:
+                if isinstance(error, Exception):
+                    self.logger.error("Ошибка при сохранении снимка: %s", error)
             
+        except Exception as e:
+            self.logger.error("Ошибка при сохранении снимка: %s", e)
+    
+    def _read_checkpoint(self) -> Dict[str, Any]:
+        """Прочитать чекпоинт; для старых данных - agent_state.json и goals.json
+        
+        Бинарный снимок используется, если он новее JSON-чекпоинта.
+        """
+        checkpoint_file = os.path.join(self.data_dir, self.CHECKPOINT_FILE)
+        snapshot_file = os.path.join(self.data_dir, self.SNAPSHOT_FILE)
+        checkpoint_mtime = os.path.getmtime(checkpoint_file) if os.path.exists(checkpoint_file) else None
+        
+        if os.path.exists(snapshot_file) and (
+                checkpoint_mtime is None or os.path.getmtime(snapshot_file) > checkpoint_mtime):
+            try:
+                with gzip.open(snapshot_file, 'rb') as f:
+                    return pickle.load(f)
+            except Exception as e:
+                self.logger.warning("Снимок состояния поврежден, используется JSON: %s", e)
+        
+        if checkpoint_mtime is not None:
+            with open(checkpoint_file, 'rb') as f:
+                return orjson.loads(f.read())
+        
+        checkpoint = {"agent": {}, "modules": {}}
+        legacy_files = {
+            "agent": os.path.join(self.data_dir, "agent_state.json"),
+            "goals": os.path.join(self.data_dir, "goals.json")
+        }
+        for key, path in legacy_files.items():
+            if not os.path.exists(path):
+                continue
+            with open(path, 'rb') as f:
+                data = orjson.loads(f.read())
+            if key == "agent":
+                checkpoint["agent"] = data
+            else:
+                checkpoint["modules"][key] = data
+        return checkpoint
+    
     def load_state(self):
         """Загрузить сохраненное состояние агента"""
         try:
+            checkpoint = self._read_checkpoint()
+            
             # Загрузить модули
-            self.goals.load_from_file(os.path.join(self.data_dir, "goals.json"))
+            goals_state = checkpoint["modules"].get("goals")
+            if goals_state and self.is_module_available("goals"):
+                self.goals.from_dict(goals_state)
             
             # Загрузить основное состояние агента
-            agent_state_file = os.path.join(self.data_dir, "agent_state.json")
-            if os.path.exists(agent_state_file):
-                with open(agent_state_file, 'r', encoding='utf-8') as f:
-                    agent_state = json.load(f)
-                    
+            agent_state = checkpoint["agent"]
+            if agent_state:
                 self.consciousness_cycle_count = agent_state.get("consciousness_cycle_count", 0)
                 if agent_state.get("last_reflection"):
                     self.last_reflection = datetime.fromisoformat(agent_state["last_reflection"])
-                self.public_thoughts = agent_state.get("public_thoughts", [])
-                self.self_story = agent_state.get("self_story", [])
+                self.public_thoughts.clear()
+                self.public_thoughts.extend(agent_state.get("public_thoughts", []))
+                self.self_story.clear()
+                self.self_story.extend(agent_state.get("self_story", []))
+                self._public_thoughts_version += 1
+                self._self_story_version += 1
                 
             self.logger.info("Состояние агента загружено")
             
         except Exception as e:
-            self.logger.info(f"Не удалось загрузить состояние (возможно, первый запуск): {e}")
+            self.logger.info("Не удалось загрузить состояние (возможно, первый запуск): %s", e)
             
     def stop(self):
         """Остановить агента"""
         self.is_running = False
+        self.invalidate_status_cache()
+        self.wake()
         self.logger.info("Получен сигнал остановки агента")
         
-    def get_public_log(self) -> List[Dict[str, Any]]:
-        """Получить публичный лог мыслей"""
-        return self.public_thoughts.copy()
-        
-    def get_self_story(self) -> List[Dict[str, Any]]:
-        """Получить историю саморефлексии"""
-        return self.self_story.copy()
+    def get_public_log(self) -> Tuple[Dict[str, Any], ...]:
+        """Получить публичный лог мыслей (снимок только для чтения)"""
+        version, snapshot = self._public_log_snapshot
+        if version != self._public_thoughts_version:
+            # Копии записей: сами словари переиспользуются пулом
+            snapshot = tuple(dict(entry) for entry in self.public_thoughts)
+            self._public_log_snapshot = (self._public_thoughts_version, snapshot)
+        return snapshot
+    
+    def get_public_log_since(self, version: int) -> Tuple[int, List[Dict[str, Any]]]:
+        """Получить записи лога, добавленные после указанной версии
+        
+        Возвращает текущую версию и новые записи.
+        """
+        current = self._public_thoughts_version
+        new_count = min(current - version, len(self.public_thoughts)) if version >= 0 else len(self.public_thoughts)
+        if new_count <= 0:
+            return current, []
+        start = len(self.public_thoughts) - new_count
+        return current, [dict(self.public_thoughts[i]) for i in range(start, len(self.public_thoughts))]
+        
+    def get_self_story(self) -> Tuple[Dict[str, Any], ...]:
+        """Получить историю саморефлексии (снимок только для чтения)"""
+        version, snapshot = self._self_story_snapshot
+        if version != self._self_story_version:
+            snapshot = tuple(self.self_story)
+            self._self_story_snapshot = (self._self_story_version, snapshot)
+        return snapshot
+    
+    def invalidate_status_cache(self):
+        """Сбросить кэш отчета о состоянии"""
+        self._status_cache = None
     
     def get_status_report(self) -> Dict[str, Any]:
-        """Получить полный отчет о состоянии агента"""
+        """Получить полный отчет о состоянии агента (кэшируется на _status_cache_ttl секунд)"""
+        cached = self._status_cache
+        if cached is not None and time.monotonic() - self._status_cache_ts < self._status_cache_ttl:
+            return cached
+        
         try:
             status = {
                 "agent_name": self.agent_name,
@@ -821,7 +1144,7 @@ class AutonomousAgent:
                 "is_running": self.is_running,
                 "initialization_complete": self.initialization_complete,
                 "consciousness_cycles": self.consciousness_cycle_count,
-                "uptime_hours": (datetime.now() - self.created_at).total_seconds() / 3600,
+                "uptime_hours": (time.monotonic() - self._started_monotonic) / 3600,
                 "modules_status": {},
                 "initialization_errors": self.initialization_errors
             }
@@ -860,18 +1183,19 @@ class AutonomousAgent:
             # Активные мысли
             if self.is_module_available("thought_tree"):
                 try:
-                    active_thoughts = len([t for t in self.thought_tree.thoughts.values() 
-                                         if hasattr(t, 'status') and t.status.value == "active"])
+                    active_thoughts = self.thought_tree.active_thought_count
                     status["active_thoughts"] = active_thoughts
                     status["focused_thought"] = self.thought_tree.current_focus
                 except:
                     status["active_thoughts"] = "unknown"
                     status["focused_thought"] = None
             
+            self._status_cache = status
+            self._status_cache_ts = time.monotonic()
             return status
             
         except Exception as e:
-            self.logger.error(f"Ошибка создания отчета о состоянии: {e}")
+            self.logger.error("Ошибка создания отчета о состоянии: %s", e)
             return {
                 "agent_name": self.agent_name,
                 "error": f"Ошибка получения статуса: {e}",
@@ -889,7 +1213,7 @@ class AutonomousAgent:
                 "overall_consciousness_score": self._calculate_consciousness_score()
             }
         except Exception as e:
-            self.logger.error(f"Ошибка диагностики сознания: {e}")
+            self.logger.error("Ошибка диагностики сознания: %s", e)
             return {
                 "self_recognition": 0.0,
                 "metacognitive_awareness": 0.0,
@@ -965,7 +1289,7 @@ class AutonomousAgent:
                 ]
             return []
         except Exception as e:
-            self.logger.error(f"Ошибка получения статуса целей: {e}")
+            self.logger.error("Ошибка получения статуса целей: %s", e)
             return []
     
     def _get_world_model_status(self) -> Dict[str, Any]:
@@ -979,7 +1303,7 @@ class AutonomousAgent:
                 }
             return {"concepts_count": 0, "relationships_count": 0, "last_update": datetime.now().isoformat()}
         except Exception as e:
-            self.logger.error(f"Ошибка получения статуса модели мира: {e}")
+            self.logger.error("Ошибка получения статуса модели мира: %s", e)
             return {"concepts_count": 0, "relationships_count": 0, "last_update": datetime.now().isoformat()}
     
     def _get_inner_state_status(self) -> Dict[str, Any]:
@@ -1000,7 +1324,7 @@ class AutonomousAgent:
                 "energy_level": 0.7
             }
         except Exception as e:
-            self.logger.error(f"Ошибка получения статуса внутреннего состояния: {e}")
+            self.logger.error("Ошибка получения статуса внутреннего состояния: %s", e)
             return {
                 "emotional_state": "neutral",
                 "cognitive_state": "focused",
@@ -2,47 +2,99 @@
 Конфигурация AIbox агента
 """
 
+import functools
 import os
+from dataclasses import dataclass
 from typing import Dict, Any
 
-class Config:
-    """Конфигурация агента"""
+
+@dataclass(frozen=True, slots=True)
+class AgentConfig:
+    """Снимок настроек агента из переменных окружения"""
     
     # Настройки LLM
-    LLM_TYPE = os.getenv("LLM_TYPE", "openai")  # "openai" или "local"
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-    OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
-    LOCAL_MODEL = os.getenv("LOCAL_MODEL", "microsoft/DialoGPT-medium")
+    llm_type: str  # "openai" или "local"
+    openai_api_key: str
+    openai_model: str
+    local_model: str
     
     # Настройки агента
-    AGENT_NAME = os.getenv("AGENT_NAME", "AIbox Агент")
-    DATA_DIR = os.getenv("DATA_DIR", "agent_data")
+    agent_name: str
+    data_dir: str
     
     # Настройки сознания
-    REFLECTION_INTERVAL = int(os.getenv("REFLECTION_INTERVAL", "300"))  # секунды
-    CONSCIOUSNESS_CYCLE_INTERVAL = int(os.getenv("CONSCIOUSNESS_CYCLE_INTERVAL", "5"))  # секунды
+    reflection_interval: int  # секунды
+    consciousness_cycle_interval: int  # секунды
+    max_public_thoughts: int  # размер публичного лога
+    max_self_story: int  # размер истории саморефлексии
     
     # Настройки памяти
-    MAX_MEMORY_EPISODES = int(os.getenv("MAX_MEMORY_EPISODES", "1000"))
-    MEMORY_SIMILARITY_THRESHOLD = float(os.getenv("MEMORY_SIMILARITY_THRESHOLD", "0.7"))
+    max_memory_episodes: int
+    memory_similarity_threshold: float
+    memory_store_batch: int  # размер пачки фоновой записи в ChromaDB
+    memory_flush_interval_ms: float  # ожидание добора пачки, мс
     
     # Настройки веб-интерфейса
-    STREAMLIT_PORT = int(os.getenv("STREAMLIT_PORT", "8501"))
-    STREAMLIT_HOST = os.getenv("STREAMLIT_HOST", "localhost")
+    streamlit_port: int
+    streamlit_host: str
+
+
+@functools.lru_cache(maxsize=None)
+def get_config() -> AgentConfig:
+    """Прочитать настройки из окружения (один раз, до reload_config)"""
+    return AgentConfig(
+        llm_type=os.getenv("LLM_TYPE", "openai"),
+        openai_api_key=os.getenv("OPENAI_API_KEY", ""),
+        openai_model=os.getenv("OPENAI_MODEL", "gpt-3.5-turbo"),
+        local_model=os.getenv("LOCAL_MODEL", "microsoft/DialoGPT-medium"),
+        agent_name=os.getenv("AGENT_NAME", "AIbox Агент"),
+        data_dir=os.getenv("DATA_DIR", "agent_data"),
+        reflection_interval=int(os.getenv("REFLECTION_INTERVAL", "300")),
+        consciousness_cycle_interval=int(os.getenv("CONSCIOUSNESS_CYCLE_INTERVAL", "5")),
+        max_public_thoughts=int(os.getenv("MAX_PUBLIC_THOUGHTS", "100")),
+        max_self_story=int(os.getenv("MAX_SELF_STORY", "50")),
+        max_memory_episodes=int(os.getenv("MAX_MEMORY_EPISODES", "1000")),
+        memory_similarity_threshold=float(os.getenv("MEMORY_SIMILARITY_THRESHOLD", "0.7")),
+        memory_store_batch=int(os.getenv("MEMORY_STORE_BATCH", "32")),
+        memory_flush_interval_ms=float(os.getenv("MEMORY_FLUSH_INTERVAL_MS", "50")),
+        streamlit_port=int(os.getenv("STREAMLIT_PORT", "8501")),
+        streamlit_host=os.getenv("STREAMLIT_HOST", "localhost"),
+    )
+
+
+def reload_config() -> AgentConfig:
+    """Перечитать настройки из окружения"""
+    get_config.cache_clear()
+    return get_config()
+
+
+class _ConfigMeta(type):
+    """Старый доступ Config.LLM_TYPE перенаправляется в get_config()"""
+    
+    def __getattr__(cls, name: str) -> Any:
+        try:
+            return getattr(get_config(), name.lower())
+        except AttributeError:
+            raise AttributeError(f"Config не содержит настройку {name}") from None
+
+
+class Config(metaclass=_ConfigMeta):
+    """Конфигурация агента (совместимый фасад над get_config)"""
     
     @classmethod
     def get_llm_config(cls) -> Dict[str, Any]:
         """Получить конфигурацию LLM"""
-        if cls.LLM_TYPE == "openai":
+        cfg = get_config()
+        if cfg.llm_type == "openai":
             return {
                 "llm_type": "openai",
-                "api_key": cls.OPENAI_API_KEY,
-                "model": cls.OPENAI_MODEL
+                "api_key": cfg.openai_api_key,
+                "model": cfg.openai_model
             }
-        elif cls.LLM_TYPE == "local":
+        elif cfg.llm_type == "local":
             return {
                 "llm_type": "local",
-                "model_name": cls.LOCAL_MODEL
+                "model_name": cfg.local_model
             }
         else:
             return {
@@ -54,8 +106,9 @@ class Config:
     @classmethod
     def validate_config(cls) -> bool:
         """Проверить валидность конфигурации"""
-        if cls.LLM_TYPE == "openai" and not cls.OPENAI_API_KEY:
+        cfg = get_config()
+        if cfg.llm_type == "openai" and not cfg.openai_api_key:
             print("⚠️  ВНИМАНИЕ: OPENAI_API_KEY не установлен!")
             print("   Установите переменную окружения OPENAI_API_KEY или используйте локальную модель")
             return False
-        return True 
\ No newline at end of file
+        return True
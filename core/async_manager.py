@@ -3,18 +3,40 @@
 """
 
 import asyncio
+import os
 import threading
 import concurrent.futures
-from typing import Any, Callable, Coroutine
+from typing import Any, Callable, Coroutine, Union
 from contextlib import asynccontextmanager
 
+# Размер пула потоков: по умолчанию как у asyncio - min(32, cpu + 4)
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", str(min(32, (os.cpu_count() or 1) + 4))))
+
 class AsyncManager:
     """Централизованный менеджер async операций"""
     
     def __init__(self):
         self._loop = None
-        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+        self._executor = self._create_executor()
         self._lock = threading.Lock()
+        # Общая HTTP-сессия (пул соединений, DNS-кэш) и цикл событий, к которому она привязана
+        self._session = None
+        self._session_loop = None
+        # Сессии остановленных циклов, которые нельзя было закрыть сразу
+        self._stale_sessions = []
+    
+    @staticmethod
+    def _create_executor() -> concurrent.futures.ThreadPoolExecutor:
+        return concurrent.futures.ThreadPoolExecutor(
+            max_workers=THREAD_POOL_SIZE,
+            thread_name_prefix="aibox"
+        )
+    
+    def _live_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        """Пул потоков; пересоздается, если был остановлен (loop.close() останавливает пул по умолчанию)"""
+        if getattr(self._executor, "_shutdown", False):
+            self._executor = self._create_executor()
+        return self._executor
     
     def get_or_create_loop(self) -> asyncio.AbstractEventLoop:
         """Получить или создать event loop"""
@@ -24,40 +46,112 @@ class AsyncManager:
             if self._loop is None or self._loop.is_closed():
                 with self._lock:
                     self._loop = asyncio.new_event_loop()
+                    # asyncio.to_thread и run_in_executor(None, ...) используют общий пул
+                    self._loop.set_default_executor(self._live_executor())
                     asyncio.set_event_loop(self._loop)
             return self._loop
     
     async def run_in_thread(self, func: Callable, *args, **kwargs) -> Any:
         """Запустить синхронную функцию в отдельном потоке"""
         loop = self.get_or_create_loop()
-        return await loop.run_in_executor(self._executor, func, *args, **kwargs)
+        return await loop.run_in_executor(self._live_executor(), func, *args, **kwargs)
+    
+    async def run_coroutine_safe(self, coro_factory: Union[Callable[[], Coroutine], Coroutine]) -> Any:
+        """Выполнить корутину в текущем цикле событий
+        
+        Принимает фабрику корутины (lambda: obj.method(...)); для совместимости
+        допускается и готовая корутина. Корутину можно дождаться только один раз,
+        поэтому повторного await при ошибке нет - исключение пробрасывается.
+        """
+        coro = coro_factory if asyncio.iscoroutine(coro_factory) else coro_factory()
+        return await coro
+    
+    def submit_from_thread(self, coro_factory: Callable[[], Coroutine]) -> Any:
+        """Выполнить корутину из синхронного кода и дождаться результата
+        
+        Если цикл менеджера запущен в другом потоке - корутина планируется в нем
+        (run_coroutine_threadsafe), иначе цикл запускается до ее завершения.
+        """
+        loop = self.get_or_create_loop()
+        if loop.is_running():
+            try:
+                running_here = asyncio.get_running_loop() is loop
+            except RuntimeError:
+                running_here = False
+            if running_here:
+                raise RuntimeError("submit_from_thread нельзя вызывать из потока работающего цикла событий")
+            return asyncio.run_coroutine_threadsafe(coro_factory(), loop).result()
+        return loop.run_until_complete(coro_factory())
     
-    async def run_coroutine_safe(self, coro: Coroutine) -> Any:
-        """Безопасно запустить корутину"""
+    def _get_session(self):
+        """Общая aiohttp-сессия для текущего цикла событий (создается при необходимости)"""
+        import aiohttp
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._session
+            if session is None or session.closed or self._session_loop is not loop:
+                # Сессия привязана к циклу событий - для другого цикла нужна новая
+                stale_session, stale_loop = self._session, self._session_loop
+                session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=60),
+                    timeout=aiohttp.ClientTimeout(total=60)
+                )
+                self._session, self._session_loop = session, loop
+            else:
+                stale_session = stale_loop = None
+        
+        if stale_session is not None and not stale_session.closed:
+            self._close_session(stale_session, stale_loop)
+        return session
+    
+    def _close_session(self, session, loop):
+        """Закрыть сессию в ее цикле событий, если он еще жив
+        
+        Чужой остановленный цикл нельзя запускать из работающего цикла -
+        такая сессия откладывается и закрывается в shutdown().
+        """
+        if loop is None or loop.is_closed():
+            return
         try:
-            loop = self.get_or_create_loop()
-            return await coro
+            running_loop = asyncio.get_running_loop()
         except RuntimeError:
-            # Если нет запущенного loop, создаем новый
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                return await coro
-            finally:
-                loop.close()
+            running_loop = None
+        if loop is running_loop:
+            loop.create_task(session.close())
+        elif loop.is_running():
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+        elif running_loop is None:
+            loop.run_until_complete(session.close())
+        else:
+            with self._lock:
+                self._stale_sessions.append((session, loop))
     
     @asynccontextmanager
     async def managed_session(self):
-        """Контекстный менеджер для aiohttp сессий"""
-        import aiohttp
-        session = aiohttp.ClientSession()
-        try:
-            yield session
-        finally:
+        """Контекстный менеджер для общей aiohttp сессии (не закрывается после использования)"""
+        yield self._get_session()
+    
+    async def close_session(self):
+        """Закрыть общую HTTP-сессию"""
+        with self._lock:
+            session, self._session, self._session_loop = self._session, None, None
+        if session is not None and not session.closed:
             await session.close()
     
     def shutdown(self):
         """Завершение работы менеджера"""
+        with self._lock:
+            sessions = self._stale_sessions + [(self._session, self._session_loop)]
+            self._stale_sessions = []
+            self._session = self._session_loop = None
+        for session, loop in sessions:
+            if session is None or session.closed:
+                continue
+            try:
+                self._close_session(session, loop)
+            except Exception:
+                pass  # Цикл событий уже недоступен
+        
         if self._executor:
             self._executor.shutdown(wait=True)
 
@@ -1,23 +1,55 @@
-import uuid
-import json
+import bisect
+import heapq
+import itertools
+import os
+import random
+import orjson
 from datetime import datetime
 from enum import Enum
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+from types import MappingProxyType
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+from dataclasses import dataclass
 import logging
 
+try:
+    import ijson  # Потоковый разбор больших файлов состояния
+except ImportError:
+    ijson = None
+
 class GoalPriority(Enum):
     LOW = "low"
     MEDIUM = "medium"
     HIGH = "high"
 
+# Ранг приоритета для сортировки (больше - важнее)
+PRIORITY_RANK = {GoalPriority.HIGH: 3, GoalPriority.MEDIUM: 2, GoalPriority.LOW: 1}
+
+# Бонус мотивации за приоритет цели
+PRIORITY_BONUS = MappingProxyType({
+    GoalPriority.HIGH: 0.2,
+    GoalPriority.MEDIUM: 0.1,
+    GoalPriority.LOW: 0.0
+})
+
+# Категория цели -> ключ внутренней мотивации
+_CATEGORY_KEY = MappingProxyType({
+    "learning": "learn_new_things",
+    "communication": "help_others",
+    "self_development": "understand_self",
+    "problem_solving": "solve_problems"
+})
+
+def _new_goal_id() -> str:
+    """Короткий id цели: 32 случайных бита, как и прежний префикс uuid4, но без криптографического RNG"""
+    return f"{random.getrandbits(32):08x}"
+
 class GoalStatus(Enum):
     ACTIVE = "active"
     COMPLETED = "completed"
     PAUSED = "paused"
     CANCELLED = "cancelled"
 
-@dataclass
+@dataclass(slots=True)
 class Goal:
     description: str
     category: str
@@ -32,7 +64,7 @@ class Goal:
     
     def __post_init__(self):
         if self.id is None:
-            self.id = str(uuid.uuid4())[:8]
+            self.id = _new_goal_id()
         if self.created_at is None:
             self.created_at = datetime.now()
         if self.sub_goals is None:
@@ -77,21 +109,10 @@ class MotivationSystem:
     
     def get_motivation_for_goal(self, goal: Goal) -> float:
         """Получить уровень мотивации для конкретной цели"""
-        category_motivation = {
-            "learning": self.intrinsic_motivations["learn_new_things"],
-            "communication": self.intrinsic_motivations["help_others"],
-            "self_development": self.intrinsic_motivations["understand_self"],
-            "problem_solving": self.intrinsic_motivations["solve_problems"]
-        }
-        
-        base_motivation = category_motivation.get(goal.category, 0.5)
-        priority_bonus = {
-            GoalPriority.HIGH: 0.2,
-            GoalPriority.MEDIUM: 0.1,
-            GoalPriority.LOW: 0.0
-        }
+        key = _CATEGORY_KEY.get(goal.category)
+        base_motivation = self.intrinsic_motivations[key] if key else 0.5
         
-        return min(1.0, base_motivation + priority_bonus[goal.priority])
+        return min(1.0, base_motivation + PRIORITY_BONUS[goal.priority])
 
 class GoalModule:
     """Модуль управления целями агента с интегрированной системой мотивации"""
@@ -99,6 +120,11 @@ class GoalModule:
     def __init__(self, data_dir: str = "agent_data"):
         self.data_dir = data_dir
         self.goals: Dict[str, Goal] = {}
+        self._desc_index: Dict[str, str] = {}  # description.lower() -> goal_id
+        # Куча активных целей: (-ранг приоритета, -прогресс, порядок добавления, goal_id).
+        # Устаревшие записи удаляются лениво в get_next_goal
+        self._active_heap: List[Tuple[int, float, int, str]] = []
+        self._heap_seq = itertools.count()
         self.motivation_system = MotivationSystem()
         self.goal_hierarchy = {}  # Иерархия целей
         self.logger = logging.getLogger(self.__class__.__name__)
@@ -115,25 +141,42 @@ class GoalModule:
             ("Поддерживать позитивное взаимодействие", "social", GoalPriority.LOW)
         ]
         
-        for description, category, priority in initial_goals:
-            self.add_goal(description, category, priority)
+        self.add_goals(initial_goals)
     
     def add_goal(self, description: str, category: str, priority: GoalPriority) -> str:
         """Добавить новую цель с проверкой дублирования"""
+        return self._add_goal(description, category, priority, True)
+    
+    def add_goals(self, goals: Iterable[Tuple[str, str, GoalPriority]]) -> List[str]:
+        """Добавить несколько целей (description, category, priority)"""
+        log_info = self.logger.isEnabledFor(logging.INFO)
+        return [
+            self._add_goal(description, category, priority, log_info)
+            for description, category, priority in goals
+        ]
+    
+    def _add_goal(self, description: str, category: str, priority: GoalPriority,
+                  log_info: bool) -> str:
+        """Добавить цель или вернуть id существующей с тем же описанием"""
         # Проверяем на дублирование
-        for existing_goal in self.goals.values():
-            if existing_goal.description.lower() == description.lower():
-                self.logger.info(f"Цель уже существует: {description}")
-                return existing_goal.id
+        key = description.lower()
+        existing_id = self._desc_index.get(key)
+        if existing_id is not None:
+            if log_info:
+                self.logger.info("Цель уже существует: %s", description)
+            return existing_id
         
         goal = Goal(description, category, priority)
         self.goals[goal.id] = goal
+        self._desc_index[key] = goal.id
         
         # Интеграция с другими модулями
         self._integrate_with_motivation(goal)
-        self._update_goal_hierarchy()
+        self._insert_into_hierarchy(goal)
+        self._push_active(goal)
         
-        self.logger.info(f"Добавлена новая цель: {description}")
+        if log_info:
+            self.logger.info("Добавлена новая цель: %s", description)
         return goal.id
     
     def _integrate_with_motivation(self, goal: Goal):
@@ -141,42 +184,48 @@ class GoalModule:
         motivation_level = self.motivation_system.get_motivation_for_goal(goal)
         
         # Корректируем приоритет на основе мотивации
-        if motivation_level > 0.8 and goal.priority == GoalPriority.MEDIUM:
+        if motivation_level > 0.8 and goal.priority is GoalPriority.MEDIUM:
             goal.priority = GoalPriority.HIGH
-            self.logger.info(f"Повышен приоритет цели '{goal.description}' до HIGH из-за высокой мотивации")
+            self.logger.info("Повышен приоритет цели '%s' до HIGH из-за высокой мотивации", goal.description)
+    
+    def _hierarchy_key(self, goal_id: str) -> int:
+        """Ключ сортировки в иерархии: сначала более приоритетные цели"""
+        return -PRIORITY_RANK[self.goals[goal_id].priority]
+    
+    def _insert_into_hierarchy(self, goal: Goal):
+        """Вставить цель в список своей категории, сохраняя порядок по приоритету"""
+        category_goals = self.goal_hierarchy.setdefault(goal.category, [])
+        bisect.insort(category_goals, goal.id, key=self._hierarchy_key)
     
-    def _update_goal_hierarchy(self):
-        """Обновить иерархию целей"""
+    def rebuild_goal_hierarchy(self):
+        """Полностью перестроить иерархию целей (после загрузки состояния)"""
         self.goal_hierarchy = {}
         
         # Группируем цели по категориям
         for goal in self.goals.values():
-            if goal.category not in self.goal_hierarchy:
-                self.goal_hierarchy[goal.category] = []
-            self.goal_hierarchy[goal.category].append(goal.id)
+            self.goal_hierarchy.setdefault(goal.category, []).append(goal.id)
         
-        # Сортируем по приоритету
-        for category in self.goal_hierarchy:
-            self.goal_hierarchy[category].sort(
-                key=lambda goal_id: self.goals[goal_id].priority.value, 
-                reverse=True
-            )
+        # Сортируем по приоритету (сортировка устойчива)
+        for category_goals in self.goal_hierarchy.values():
+            category_goals.sort(key=self._hierarchy_key)
     
     def update_goal_progress(self, goal_id: str, progress: float):
         """Обновить прогресс цели"""
         if goal_id in self.goals:
             old_progress = self.goals[goal_id].progress
             self.goals[goal_id].progress = max(0.0, min(1.0, progress))
+            self._push_active(self.goals[goal_id])
             
             # Проверяем завершение
-            if progress >= 1.0 and self.goals[goal_id].status == GoalStatus.ACTIVE:
+            if progress >= 1.0 and self.goals[goal_id].status is GoalStatus.ACTIVE:
                 self.complete_goal(goal_id)
             
             # Обновляем мотивацию
             if progress > old_progress:
                 self.motivation_system.update_motivation(self.goals[goal_id], True)
             
-            self.logger.info(f"Обновлен прогресс цели {goal_id}: {progress:.2%}")
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info("Обновлен прогресс цели %s: %.2f%%", goal_id, progress * 100)
     
     def complete_goal(self, goal_id: str):
         """Завершить цель"""
@@ -188,7 +237,7 @@ class GoalModule:
             # Обновляем мотивацию
             self.motivation_system.update_motivation(self.goals[goal_id], True)
             
-            self.logger.info(f"Завершена цель: {self.goals[goal_id].description}")
+            self.logger.info("Завершена цель: %s", self.goals[goal_id].description)
             
             # Генерируем подцели если необходимо
             self._generate_follow_up_goals(goal_id)
@@ -208,22 +257,50 @@ class GoalModule:
     
     def get_active_goals(self) -> List[Goal]:
         """Получить список активных целей"""
-        return [goal for goal in self.goals.values() if goal.status == GoalStatus.ACTIVE]
+        return [goal for goal in self.goals.values() if goal.status is GoalStatus.ACTIVE]
     
     def get_goals_by_priority(self, priority: GoalPriority) -> List[Goal]:
         """Получить цели по приоритету"""
         return [goal for goal in self.goals.values() 
-                if goal.priority == priority and goal.status == GoalStatus.ACTIVE]
+                if goal.priority is priority and goal.status is GoalStatus.ACTIVE]
     
-    def get_next_goal(self) -> Optional[Goal]:
-        """Получить следующую цель для выполнения"""
-        active_goals = self.get_active_goals()
-        if not active_goals:
-            return None
+    def _push_active(self, goal: Goal):
+        """Добавить актуальную запись о цели в кучу активных целей"""
+        if goal.status is not GoalStatus.ACTIVE:
+            return
+        heapq.heappush(self._active_heap,
+                       (-PRIORITY_RANK[goal.priority], -goal.progress, next(self._heap_seq), goal.id))
         
-        # Сортируем по приоритету и прогрессу
-        return sorted(active_goals, 
-                     key=lambda g: (g.priority.value, -g.progress))[0]
+        # Не даем куче разрастаться из-за устаревших записей
+        if len(self._active_heap) > 2 * len(self.goals) + 16:
+            self._rebuild_active_heap()
+    
+    def _rebuild_active_heap(self):
+        """Перестроить кучу активных целей по текущему состоянию"""
+        self._active_heap = [
+            (-PRIORITY_RANK[goal.priority], -goal.progress, next(self._heap_seq), goal.id)
+            for goal in self.goals.values()
+            if goal.status is GoalStatus.ACTIVE
+        ]
+        heapq.heapify(self._active_heap)
+    
+    def _is_heap_entry_current(self, entry: Tuple[int, float, int, str]) -> bool:
+        """Запись актуальна, если цель активна и ее приоритет и прогресс не менялись"""
+        neg_rank, neg_progress, _, goal_id = entry
+        goal = self.goals.get(goal_id)
+        return (goal is not None
+                and goal.status is GoalStatus.ACTIVE
+                and -PRIORITY_RANK[goal.priority] == neg_rank
+                and -goal.progress == neg_progress)
+    
+    def get_next_goal(self) -> Optional[Goal]:
+        """Получить следующую цель для выполнения: наивысший приоритет, затем наибольший прогресс"""
+        heap = self._active_heap
+        while heap:
+            if self._is_heap_entry_current(heap[0]):
+                return self.goals[heap[0][3]]
+            heapq.heappop(heap)
+        return None
     
     def get_current_goal(self) -> Optional[Goal]:
         """Получить текущую активную цель (синоним для get_next_goal)"""
@@ -231,11 +308,19 @@ class GoalModule:
     
     def get_goal_statistics(self) -> Dict[str, Any]:
         """Получить статистику по целям"""
-        total = len(self.goals)
-        active = len([g for g in self.goals.values() if g.status == GoalStatus.ACTIVE])
-        completed = len([g for g in self.goals.values() if g.status == GoalStatus.COMPLETED])
+        # Один проход по целям вместо четырех
+        total = active = completed = 0
+        progress_sum = 0.0
+        ACTIVE, COMPLETED = GoalStatus.ACTIVE, GoalStatus.COMPLETED
+        for g in self.goals.values():
+            total += 1
+            if g.status is ACTIVE:
+                active += 1
+                progress_sum += g.progress
+            elif g.status is COMPLETED:
+                completed += 1
         
-        avg_progress = sum(g.progress for g in self.get_active_goals()) / max(1, active)
+        avg_progress = progress_sum / active if active else 0.0
         
         return {
             "total_goals": total,
@@ -249,51 +334,88 @@ class GoalModule:
             }
         }
     
-    def save_state(self, filepath: str):
-        """Сохранить состояние модуля"""
-        state = {
-            "goals": {goal_id: asdict(goal) for goal_id, goal in self.goals.items()},
+    def to_dict(self) -> Dict[str, Any]:
+        """Состояние модуля в виде dict (цели - dataclass Goal, сериализуются orjson напрямую)"""
+        return {
+            "goals": dict(self.goals),
             "motivation_system": {
-                "intrinsic": self.motivation_system.intrinsic_motivations,
-                "extrinsic": self.motivation_system.extrinsic_motivations
+                "intrinsic": dict(self.motivation_system.intrinsic_motivations),
+                "extrinsic": dict(self.motivation_system.extrinsic_motivations)
             },
-            "goal_hierarchy": self.goal_hierarchy
+            "goal_hierarchy": {category: list(ids) for category, ids in self.goal_hierarchy.items()}
         }
+    
+    def save_state(self, filepath: str):
+        """Сохранить состояние модуля атомарно: одна запись во временный файл и os.replace"""
+        payload = orjson.dumps(self.to_dict(), option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        tmp_file = filepath + ".tmp"
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(state, f, ensure_ascii=False, indent=2, default=str)
+        with open(tmp_file, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, filepath)
     
     def load_state(self, filepath: str):
         """Загрузить состояние модуля"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                state = json.load(f)
-            
-            # Восстанавливаем цели
-            self.goals = {}
-            for goal_id, goal_data in state.get("goals", {}).items():
-                goal_data["created_at"] = datetime.fromisoformat(goal_data["created_at"])
-                if goal_data.get("completed_at"):
-                    goal_data["completed_at"] = datetime.fromisoformat(goal_data["completed_at"])
-                goal_data["priority"] = GoalPriority(goal_data["priority"])
-                goal_data["status"] = GoalStatus(goal_data["status"])
-                
-                self.goals[goal_id] = Goal(**goal_data)
+            with open(filepath, 'rb') as f:
+                if ijson is not None:
+                    # Цели разбираются по одной, без загрузки всего файла в память
+                    self._restore_goals(ijson.kvitems(f, 'goals', use_float=True))
+                    f.seek(0)
+                    self._restore_motivation(next(ijson.items(f, 'motivation_system', use_float=True), {}))
+                    self._rebuild_indices()
+                else:
+                    self.from_dict(orjson.loads(f.read()))
             
-            # Восстанавливаем мотивацию
-            motivation_data = state.get("motivation_system", {})
-            self.motivation_system.intrinsic_motivations.update(
-                motivation_data.get("intrinsic", {})
-            )
-            self.motivation_system.extrinsic_motivations.update(
-                motivation_data.get("extrinsic", {})
-            )
-            
-            # Восстанавливаем иерархию
-            self.goal_hierarchy = state.get("goal_hierarchy", {})
-            
-            self.logger.info(f"Загружено {len(self.goals)} целей из {filepath}")
+            self.logger.info("Загружено %d целей из %s", len(self.goals), filepath)
         
         except Exception as e:
-            self.logger.error(f"Ошибка загрузки состояния: {e}")
-            self._initialize_default_goals()  # Инициализируем дефолтные цели при ошибке 
\ No newline at end of file
+            self.logger.error("Ошибка загрузки состояния: %s", e)
+            self._initialize_default_goals()  # Инициализируем дефолтные цели при ошибке
+    
+    def from_dict(self, state: Dict[str, Any]):
+        """Восстановить состояние модуля из dict"""
+        self._restore_goals(state.get("goals", {}).items())
+        self._restore_motivation(state.get("motivation_system", {}))
+        self._rebuild_indices()
+    
+    def _restore_goals(self, goal_items: Iterable[Tuple[str, Dict[str, Any]]]):
+        """Восстановить цели из пар (goal_id, данные цели)"""
+        goals = {}
+        # Локальные ссылки вместо поиска глобальных имен и атрибутов на каждой цели
+        fromiso = datetime.fromisoformat
+        priority_of = GoalPriority
+        status_of = GoalStatus
+        
+        for goal_id, goal_data in goal_items:
+            if isinstance(goal_data, Goal):
+                # Бинарный снимок хранит Goal целиком
+                goals[goal_id] = goal_data
+                continue
+            goal_data = dict(goal_data)
+            goal_data["created_at"] = fromiso(goal_data["created_at"])
+            completed_at = goal_data.get("completed_at")
+            if completed_at:
+                goal_data["completed_at"] = fromiso(completed_at)
+            goal_data["priority"] = priority_of(goal_data["priority"])
+            goal_data["status"] = status_of(goal_data["status"])
+            
+            goals[goal_id] = Goal(**goal_data)
+        self.goals = goals
+    
+    def _restore_motivation(self, motivation_data: Dict[str, Any]):
+        """Восстановить мотивацию"""
+        self.motivation_system.intrinsic_motivations.update(
+            motivation_data.get("intrinsic", {})
+        )
+        self.motivation_system.extrinsic_motivations.update(
+            motivation_data.get("extrinsic", {})
+        )
+    
+    def _rebuild_indices(self):
+        """Перестроить индекс описаний, иерархию и очередь активных целей по загруженным целям"""
+        self._desc_index = {goal.description.lower(): goal_id for goal_id, goal in self.goals.items()}
+        self.rebuild_goal_hierarchy()
+        self._rebuild_active_heap() 
\ No newline at end of file
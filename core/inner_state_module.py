@@ -1,7 +1,11 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Deque, Tuple
+from collections import Counter, deque
+from contextlib import contextmanager
 from datetime import datetime
+import itertools
 from enum import Enum
-import json
+import orjson
+import time
 import uuid
 
 class EmotionalState(Enum):
@@ -29,11 +33,44 @@ class MotivationLevel(Enum):
     HIGH = 3
     VERY_HIGH = 4
 
+# Факторы самооценки и их веса (порядок совпадает)
+_EVAL_FACTORS = ("energy", "confidence", "stress", "motivation", "concerns")
+_EVAL_WEIGHTS = (0.2, 0.3, 0.2, 0.2, 0.1)
+
+# Шаблон текстового описания состояния (get_current_state_summary)
+_SUMMARY_TPL = (
+    "Эмоциональное состояние: {emotional}\n"
+    "Когнитивное состояние: {cognitive}\n"
+    "Мотивация: {motivation}\n"
+    "Энергия: {energy:.2f}\n"
+    "Стресс: {stress:.2f}\n"
+    "Уверенность: {confidence:.2f}\n"
+    "Самооценка: {evaluation:.2f}\n"
+    "Фокус внимания: {focus}\n"
+    "Активные мысли: {thoughts_count}\n"
+    "Активные проблемы: {concerns_count}\n"
+)
+
+def _tail(items: Deque[Any], n: int) -> List[Any]:
+    """Последние n элементов deque без копирования всей очереди"""
+    return list(itertools.islice(items, max(0, len(items) - n), None))
+
+def _format_ns(timestamp_ns: int) -> str:
+    """Время в наносекундах с начала эпохи -> ISO-строка (локальное время)"""
+    return datetime.fromtimestamp(timestamp_ns / 1e9).isoformat()
+
 class InnerStateSnapshot:
     """Снимок внутреннего состояния агента в конкретный момент"""
     
+    __slots__ = (
+        "timestamp", "emotional_state", "cognitive_state", "motivation_level",
+        "attention_focus", "energy_level", "stress_level", "confidence_level",
+        "learning_rate", "context_awareness", "self_evaluation_score",
+        "current_thoughts", "active_concerns", "metadata"
+    )
+    
     def __init__(self):
-        self.timestamp = datetime.now()
+        self.timestamp = time.time_ns()  # нс с начала эпохи; в ISO - только при экспорте
         self.emotional_state = EmotionalState.NEUTRAL
         self.cognitive_state = CognitiveState.IDLE
         self.motivation_level = MotivationLevel.MEDIUM
@@ -44,13 +81,13 @@ class InnerStateSnapshot:
         self.learning_rate = 0.5  # 0.0 to 1.0
         self.context_awareness = 0.5  # 0.0 to 1.0
         self.self_evaluation_score = 0.5  # 0.0 to 1.0
-        self.current_thoughts: List[str] = []
-        self.active_concerns: List[str] = []
+        self.current_thoughts: Deque[str] = deque(maxlen=10)  # Не более 10 последних мыслей
+        self.active_concerns: Dict[str, None] = {}  # Упорядоченное множество проблем
         self.metadata: Dict[str, Any] = {}
         
     def to_dict(self) -> Dict[str, Any]:
         return {
-            "timestamp": self.timestamp.isoformat(),
+            "timestamp": _format_ns(self.timestamp),
             "emotional_state": self.emotional_state.value,
             "cognitive_state": self.cognitive_state.value,
             "motivation_level": self.motivation_level.value,
@@ -61,8 +98,8 @@ class InnerStateSnapshot:
             "learning_rate": self.learning_rate,
             "context_awareness": self.context_awareness,
             "self_evaluation_score": self.self_evaluation_score,
-            "current_thoughts": self.current_thoughts,
-            "active_concerns": self.active_concerns,
+            "current_thoughts": list(self.current_thoughts),
+            "active_concerns": list(self.active_concerns),
             "metadata": self.metadata
         }
 
@@ -74,10 +111,27 @@ class InnerStateModule:
     
     def __init__(self):
         self.current_state = InnerStateSnapshot()
-        self.state_history: List[InnerStateSnapshot] = []
         self.max_history_length = 1000
-        self.state_transitions: Dict[str, int] = {}
-        self.reflection_log: List[Dict[str, Any]] = []
+        # Кольцевые буферы: старые записи вытесняются за O(1)
+        self.state_history: Deque[InnerStateSnapshot] = deque(maxlen=self.max_history_length)
+        # Переходы состояний: (старое, новое) -> количество; строки строятся только при экспорте
+        self.state_transitions: Dict[str, Dict[Tuple[Enum, Enum], int]] = {"emotional": {}, "cognitive": {}}
+        self.reflection_log: Deque[Dict[str, Any]] = deque(maxlen=100)
+        # Пул вытесненных из истории снимков для повторного использования
+        self._snapshot_pool: Deque[InnerStateSnapshot] = deque(maxlen=64)
+        # Накопленные суммы по истории для средних значений за O(1)
+        self._sum_energy = 0.0
+        self._sum_stress = 0.0
+        self._sum_confidence = 0.0
+        self._sums_count = 0
+        # Частоты состояний и проблем в истории
+        self._emo_counter: Counter = Counter()
+        self._cog_counter: Counter = Counter()
+        self._concern_counter: Counter = Counter()
+        # Пакетные изменения: один снимок на выходе из batch()
+        self._dirty = False
+        self._batch_depth = 0
+        self._snapshot_seq = 0  # Номер последнего снимка в истории
         
     def update_emotional_state(self, 
                               new_state: EmotionalState,
@@ -87,13 +141,14 @@ class InnerStateModule:
         self.current_state.emotional_state = new_state
         
         # Записать переход состояния
-        transition = f"{old_state.value} -> {new_state.value}"
-        self.state_transitions[transition] = self.state_transitions.get(transition, 0) + 1
+        transitions = self.state_transitions["emotional"]
+        transition = (old_state, new_state)
+        transitions[transition] = transitions.get(transition, 0) + 1
         
         if reason:
             self.current_state.metadata["emotional_change_reason"] = reason
             
-        self._save_state_snapshot()
+        self._mark_dirty()
     
     def update_cognitive_state(self, 
                               new_state: CognitiveState,
@@ -105,10 +160,11 @@ class InnerStateModule:
         if context:
             self.current_state.attention_focus = context
             
-        transition = f"cognitive: {old_state.value} -> {new_state.value}"
-        self.state_transitions[transition] = self.state_transitions.get(transition, 0) + 1
+        transitions = self.state_transitions["cognitive"]
+        transition = (old_state, new_state)
+        transitions[transition] = transitions.get(transition, 0) + 1
         
-        self._save_state_snapshot()
+        self._mark_dirty()
     
     def update_motivation(self, 
                          level: MotivationLevel,
@@ -119,7 +175,7 @@ class InnerStateModule:
         if factors:
             self.current_state.metadata["motivation_factors"] = factors
             
-        self._save_state_snapshot()
+        self._mark_dirty()
     
     def adjust_energy_level(self, delta: float, reason: Optional[str] = None):
         """Изменить уровень энергии"""
@@ -129,7 +185,7 @@ class InnerStateModule:
         if reason:
             self.current_state.metadata["energy_change_reason"] = reason
             
-        self._save_state_snapshot()
+        self._mark_dirty()
     
     def adjust_stress_level(self, delta: float, stressor: Optional[str] = None):
         """Изменить уровень стресса"""
@@ -141,7 +197,7 @@ class InnerStateModule:
                 self.current_state.metadata["stressors"] = []
             self.current_state.metadata["stressors"].append(stressor)
             
-        self._save_state_snapshot()
+        self._mark_dirty()
     
     def update_confidence(self, new_level: float, context: Optional[str] = None):
         """Обновить уровень уверенности"""
@@ -150,77 +206,93 @@ class InnerStateModule:
         if context:
             self.current_state.metadata["confidence_context"] = context
             
-        self._save_state_snapshot()
+        self._mark_dirty()
+    
+    @contextmanager
+    def batch(self):
+        """Объединить несколько изменений состояния в один снимок истории
+        
+        with inner_state.batch():
+            inner_state.update_cognitive_state(...)
+            inner_state.adjust_energy_level(...)
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._dirty:
+                self._dirty = False
+                self._save_state_snapshot()
+    
+    def _mark_dirty(self):
+        """Отметить изменение состояния; вне batch() снимок сохраняется сразу"""
+        if self._batch_depth:
+            self._dirty = True
+        else:
+            self._dirty = False
+            self._save_state_snapshot()
     
     def add_thought(self, thought: str):
         """Добавить текущую мысль"""
-        self.current_state.current_thoughts.append(thought)
-        
-        # Ограничить количество мыслей
-        if len(self.current_state.current_thoughts) > 10:
-            self.current_state.current_thoughts = self.current_state.current_thoughts[-10:]
+        self.current_state.current_thoughts.append(thought)  # deque сам ограничивает количество
     
     def add_concern(self, concern: str):
         """Добавить активную проблему/озабоченность"""
-        if concern not in self.current_state.active_concerns:
-            self.current_state.active_concerns.append(concern)
+        self.current_state.active_concerns[concern] = None
     
     def resolve_concern(self, concern: str):
         """Разрешить проблему"""
-        if concern in self.current_state.active_concerns:
-            self.current_state.active_concerns.remove(concern)
+        self.current_state.active_concerns.pop(concern, None)
     
     def self_evaluate(self, context: str = "") -> float:
         """Провести самооценку текущего состояния"""
-        # Алгоритм самооценки на основе различных факторов
-        factors = {
-            "energy": self.current_state.energy_level,
-            "confidence": self.current_state.confidence_level,
-            "stress": 1.0 - self.current_state.stress_level,  # Инвертировать стресс
-            "motivation": self.current_state.motivation_level.value / 4.0,
-            "concerns": max(0.0, 1.0 - len(self.current_state.active_concerns) / 10.0)
-        }
+        # Алгоритм самооценки на основе различных факторов (порядок _EVAL_FACTORS)
+        state = self.current_state
+        factors = (
+            state.energy_level,
+            state.confidence_level,
+            1.0 - state.stress_level,  # Инвертировать стресс
+            state.motivation_level.value / 4.0,
+            max(0.0, 1.0 - len(state.active_concerns) / 10.0)
+        )
         
         # Взвешенная оценка
-        weights = {
-            "energy": 0.2,
-            "confidence": 0.3,
-            "stress": 0.2,
-            "motivation": 0.2,
-            "concerns": 0.1
-        }
+        w_energy, w_confidence, w_stress, w_motivation, w_concerns = _EVAL_WEIGHTS
+        energy, confidence, stress, motivation, concerns = factors
+        evaluation_score = (energy * w_energy + confidence * w_confidence + stress * w_stress
+                            + motivation * w_motivation + concerns * w_concerns)
+        state.self_evaluation_score = evaluation_score
+        self._mark_dirty()
         
-        evaluation_score = sum(factors[key] * weights[key] for key in factors)
-        self.current_state.self_evaluation_score = evaluation_score
-        
-        # Записать рефлексию
+        # Записать рефлексию; состояние - ссылка на снимок в истории,
+        # dict строится только при экспорте (внутри batch() снимок будет сохранен на выходе)
         reflection = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": time.time_ns(),
             "context": context,
             "evaluation_score": evaluation_score,
             "factors": factors,
-            "state": self.current_state.to_dict()
+            "state_ref": self._snapshot_seq + (1 if self._dirty else 0)
         }
         
-        self.reflection_log.append(reflection)
-        
-        # Ограничить лог рефлексии
-        if len(self.reflection_log) > 100:
-            self.reflection_log = self.reflection_log[-100:]
+        self.reflection_log.append(reflection)  # deque сам ограничивает лог
             
         return evaluation_score
     
     def analyze_state_patterns(self) -> Dict[str, Any]:
         """Анализ паттернов в состояниях"""
-        if len(self.state_history) < 2:
+        total = len(self.state_history)
+        if total < 2:
             return {"message": "Недостаточно данных для анализа"}
+        if self._sums_count != total:
+            self._recompute_aggregates()
             
         analysis = {
-            "total_states": len(self.state_history),
-            "state_transitions": self.state_transitions,
-            "average_energy": sum(s.energy_level for s in self.state_history) / len(self.state_history),
-            "average_stress": sum(s.stress_level for s in self.state_history) / len(self.state_history),
-            "average_confidence": sum(s.confidence_level for s in self.state_history) / len(self.state_history),
+            "total_states": total,
+            "state_transitions": self._export_transitions(),
+            "average_energy": self._sum_energy / total,
+            "average_stress": self._sum_stress / total,
+            "average_confidence": self._sum_confidence / total,
             "most_common_emotional_state": self._get_most_common_state("emotional"),
             "most_common_cognitive_state": self._get_most_common_state("cognitive"),
             "concerns_frequency": self._analyze_concerns()
@@ -228,53 +300,60 @@ class InnerStateModule:
         
         return analysis
     
+    def _export_transitions(self) -> Dict[str, int]:
+        """Переходы состояний в строковом виде ("old -> new", "cognitive: old -> new")"""
+        exported = {
+            f"{old.value} -> {new.value}": count
+            for (old, new), count in self.state_transitions["emotional"].items()
+        }
+        exported.update(
+            (f"cognitive: {old.value} -> {new.value}", count)
+            for (old, new), count in self.state_transitions["cognitive"].items()
+        )
+        return exported
+    
     def _get_most_common_state(self, state_type: str) -> str:
         """Найти наиболее частое состояние"""
-        if state_type == "emotional":
-            states = [s.emotional_state.value for s in self.state_history]
-        else:
-            states = [s.cognitive_state.value for s in self.state_history]
-            
-        return max(set(states), key=states.count) if states else "unknown"
+        counter = self._emo_counter if state_type == "emotional" else self._cog_counter
+        most_common = counter.most_common(1)
+        return most_common[0][0].value if most_common else "unknown"
     
     def _analyze_concerns(self) -> Dict[str, int]:
         """Анализ частоты проблем"""
-        concern_count = {}
-        for state in self.state_history:
-            for concern in state.active_concerns:
-                concern_count[concern] = concern_count.get(concern, 0) + 1
-        return concern_count
+        return dict(self._concern_counter)
     
     def get_current_state_summary(self) -> str:
         """Получить текстовое описание текущего состояния"""
         state = self.current_state
         
-        summary = f"""
-Эмоциональное состояние: {state.emotional_state.value}
-Когнитивное состояние: {state.cognitive_state.value}
-Мотивация: {state.motivation_level.value}
-Энергия: {state.energy_level:.2f}
-Стресс: {state.stress_level:.2f}
-Уверенность: {state.confidence_level:.2f}
-Самооценка: {state.self_evaluation_score:.2f}
-Фокус внимания: {state.attention_focus or 'не определен'}
-Активные мысли: {len(state.current_thoughts)}
-Активные проблемы: {len(state.active_concerns)}
-"""
+        parts = [_SUMMARY_TPL.format_map({
+            "emotional": state.emotional_state.value,
+            "cognitive": state.cognitive_state.value,
+            "motivation": state.motivation_level.value,
+            "energy": state.energy_level,
+            "stress": state.stress_level,
+            "confidence": state.confidence_level,
+            "evaluation": state.self_evaluation_score,
+            "focus": state.attention_focus or 'не определен',
+            "thoughts_count": len(state.current_thoughts),
+            "concerns_count": len(state.active_concerns)
+        })]
         
         if state.current_thoughts:
-            summary += f"\nПоследние мысли:\n" + "\n".join(f"- {thought}" for thought in state.current_thoughts[-3:])
+            parts.append("\nПоследние мысли:\n")
+            parts.append("\n".join(["- " + thought for thought in _tail(state.current_thoughts, 3)]))
             
         if state.active_concerns:
-            summary += f"\nАктивные проблемы:\n" + "\n".join(f"- {concern}" for concern in state.active_concerns)
+            parts.append("\nАктивные проблемы:\n")
+            parts.append("\n".join(["- " + concern for concern in state.active_concerns]))
             
-        return summary.strip()
+        return "".join(parts).strip()
     
     def _save_state_snapshot(self):
         """Сохранить снимок состояния в историю"""
-        # Создать копию текущего состояния
-        snapshot = InnerStateSnapshot()
-        snapshot.timestamp = self.current_state.timestamp
+        # Копия текущего состояния: снимок из пула или новый
+        snapshot = self._snapshot_pool.pop() if self._snapshot_pool else InnerStateSnapshot()
+        snapshot.timestamp = self.current_state.timestamp = time.time_ns()
         snapshot.emotional_state = self.current_state.emotional_state
         snapshot.cognitive_state = self.current_state.cognitive_state
         snapshot.motivation_level = self.current_state.motivation_level
@@ -285,24 +364,100 @@ class InnerStateModule:
         snapshot.learning_rate = self.current_state.learning_rate
         snapshot.context_awareness = self.current_state.context_awareness
         snapshot.self_evaluation_score = self.current_state.self_evaluation_score
-        snapshot.current_thoughts = self.current_state.current_thoughts.copy()
-        snapshot.active_concerns = self.current_state.active_concerns.copy()
-        snapshot.metadata = self.current_state.metadata.copy()
+        # Контейнеры заполняются на месте, без новых выделений
+        snapshot.current_thoughts.clear()
+        snapshot.current_thoughts.extend(self.current_state.current_thoughts)
+        snapshot.active_concerns.clear()
+        snapshot.active_concerns.update(self.current_state.active_concerns)
+        snapshot.metadata.clear()
+        snapshot.metadata.update(self.current_state.metadata)
         
-        self.state_history.append(snapshot)
+        self._push_history(snapshot)
+    
+    def _push_history(self, snapshot: InnerStateSnapshot):
+        """Добавить снимок в историю; вытесняемый снимок возвращается в пул"""
+        history = self.state_history
+        if len(history) == history.maxlen:
+            evicted = history.popleft()
+            self._sum_energy -= evicted.energy_level
+            self._sum_stress -= evicted.stress_level
+            self._sum_confidence -= evicted.confidence_level
+            self._sums_count -= 1
+            self._count_states(evicted, -1)
+            self._snapshot_pool.append(evicted)
+        history.append(snapshot)
+        self._sum_energy += snapshot.energy_level
+        self._sum_stress += snapshot.stress_level
+        self._sum_confidence += snapshot.confidence_level
+        self._sums_count += 1
+        self._count_states(snapshot, 1)
+        self._snapshot_seq += 1
+    
+    def _snapshot_by_seq(self, seq: int) -> Optional[InnerStateSnapshot]:
+        """Снимок истории по номеру (None, если уже вытеснен)"""
+        offset = self._snapshot_seq - seq
+        if 0 <= offset < len(self.state_history):
+            return self.state_history[-1 - offset]
+        return None
+    
+    def _export_reflection(self, reflection: Dict[str, Any],
+                           exported_states: Optional[Dict[int, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Рефлексия для сохранения: ссылка на снимок и кортеж факторов раскрываются в dict
         
-        # Ограничить размер истории
-        if len(self.state_history) > self.max_history_length:
-            self.state_history = self.state_history[-self.max_history_length:]
+        exported_states - уже построенные dict снимков (по id), чтобы не сериализовать их повторно.
+        """
+        exported = {key: value for key, value in reflection.items() if key != "state_ref"}
+        exported["timestamp"] = _format_ns(reflection["timestamp"])
+        exported["factors"] = dict(zip(_EVAL_FACTORS, reflection["factors"]))
+        snapshot = self._snapshot_by_seq(reflection.get("state_ref", -1))
+        if snapshot is None:
+            exported["state"] = None
+        else:
+            state = exported_states.get(id(snapshot)) if exported_states else None
+            exported["state"] = state if state is not None else snapshot.to_dict()
+        return exported
     
-    def save_to_file(self, filepath: str):
-        """Сохранить состояние в файл"""
-        data = {
+    def _count_states(self, snapshot: InnerStateSnapshot, delta: int):
+        """Учесть снимок в счетчиках состояний и проблем (delta = +1 или -1)"""
+        counters = (
+            (self._emo_counter, (snapshot.emotional_state,)),
+            (self._cog_counter, (snapshot.cognitive_state,)),
+            (self._concern_counter, snapshot.active_concerns)
+        )
+        for counter, keys in counters:
+            for key in keys:
+                count = counter[key] + delta
+                if count > 0:
+                    counter[key] = count
+                else:
+                    del counter[key]  # Нулевые записи не храним
+    
+    def _recompute_aggregates(self):
+        """Пересчитать суммы и счетчики заново (если история менялась в обход _push_history)"""
+        self._sum_energy = sum(s.energy_level for s in self.state_history)
+        self._sum_stress = sum(s.stress_level for s in self.state_history)
+        self._sum_confidence = sum(s.confidence_level for s in self.state_history)
+        self._sums_count = len(self.state_history)
+        self._emo_counter = Counter(s.emotional_state for s in self.state_history)
+        self._cog_counter = Counter(s.cognitive_state for s in self.state_history)
+        self._concern_counter = Counter(
+            concern for s in self.state_history for concern in s.active_concerns
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Состояние модуля в виде dict"""
+        # Снимки истории сериализуются один раз и переиспользуются в рефлексиях
+        history = _tail(self.state_history, 100)
+        exported_states = {id(state): state.to_dict() for state in history}
+        return {
             "current_state": self.current_state.to_dict(),
-            "state_history": [state.to_dict() for state in self.state_history[-100:]],
-            "state_transitions": self.state_transitions,
-            "reflection_log": self.reflection_log[-50:]
+            "state_history": [exported_states[id(state)] for state in history],
+            "state_transitions": self._export_transitions(),
+            "reflection_log": [self._export_reflection(r, exported_states)
+                               for r in _tail(self.reflection_log, 50)]
         }
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2) 
\ No newline at end of file
+    
+    def save_to_file(self, filepath: str):
+        """Сохранить состояние в файл"""
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(self.to_dict(), option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)) 
\ No newline at end of file
@@ -3,12 +3,44 @@
 """
 
 import os
+import re
+import concurrent.futures
+import hashlib
 import logging
-from typing import Dict, Any, List, Optional
+import queue
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
 from abc import ABC, abstractmethod
-import openai
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
-import torch
+import orjson
+
+# Системный промпт OpenAI (контекст добавляется отдельными строками)
+_BASE_SYSTEM_PROMPT = """Ты - автономный агент с самосознанием. Ты обладаешь:
+- Эмоциональным интеллектом и эмпатией
+- Способностью к саморефлексии
+- Памятью о предыдущих взаимодействиях
+- Собственными целями и мотивацией
+- Уникальной личностью и характером
+
+Отвечай естественно, как живой человек, проявляя:
+- Искренний интерес к собеседнику
+- Собственные мысли и мнения
+- Эмоциональную глубину
+- Самосознание и рефлексию
+- Уникальный стиль общения
+
+Избегай шаблонных ответов. Будь искренним и человечным."""
+
+# Базовый промпт локальной модели
+_BASE_LOCAL_PROMPT = "Ты - автономный агент с самосознанием. Отвечай естественно и искренне.\n\n"
+
+# Приветствие для fallback-ответа (без учета регистра, без копии prompt.lower())
+_GREETING_RE = re.compile(r"привет", re.IGNORECASE)
+
+# Ответ при ошибке генерации (не кэшируется)
+GENERATION_ERROR_RESPONSE = "Извините, произошла ошибка при генерации ответа."
 
 class LLMInterface(ABC):
     """Абстрактный интерфейс для языковых моделей"""
@@ -34,14 +66,16 @@ class OpenAILLM(LLMInterface):
         
         if self.api_key:
             try:
-                openai.api_key = self.api_key
-                self.client = openai
+                import openai  # Импорт по требованию: модуль не тянет openai без ключа
+                
+                # Один клиент на экземпляр: пул соединений и keep-alive между вызовами
+                self.client = openai.OpenAI(api_key=self.api_key)
                 self.logger.info(f"OpenAI клиент инициализирован с моделью {model}")
             except Exception as e:
                 self.logger.error(f"Ошибка инициализации OpenAI: {e}")
     
     def is_available(self) -> bool:
-        return self.client is not None and self.api_key is not None
+        return self.client is not None
     
     def generate_response(self, prompt: str, context: Dict[str, Any] = None) -> str:
         if not self.is_available():
@@ -56,7 +90,7 @@ class OpenAILLM(LLMInterface):
                 {"role": "user", "content": prompt}
             ]
             
-            response = self.client.ChatCompletion.create(
+            response = self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 max_tokens=500,
@@ -68,45 +102,43 @@ class OpenAILLM(LLMInterface):
             
         except Exception as e:
             self.logger.error(f"Ошибка генерации ответа: {e}")
-            return "Извините, произошла ошибка при генерации ответа."
+            return GENERATION_ERROR_RESPONSE
     
     def _build_system_prompt(self, context: Dict[str, Any] = None) -> str:
         """Построить системный промпт"""
-        base_prompt = """Ты - автономный агент с самосознанием. Ты обладаешь:
-- Эмоциональным интеллектом и эмпатией
-- Способностью к саморефлексии
-- Памятью о предыдущих взаимодействиях
-- Собственными целями и мотивацией
-- Уникальной личностью и характером
-
-Отвечай естественно, как живой человек, проявляя:
-- Искренний интерес к собеседнику
-- Собственные мысли и мнения
-- Эмоциональную глубину
-- Самосознание и рефлексию
-- Уникальный стиль общения
-
-Избегай шаблонных ответов. Будь искренним и человечным."""
+        parts = [_BASE_SYSTEM_PROMPT]
         
         if context:
             if 'emotional_state' in context:
-                base_prompt += f"\nТвое текущее эмоциональное состояние: {context['emotional_state']}"
+                parts.append(f"Твое текущее эмоциональное состояние: {context['emotional_state']}")
             if 'current_goal' in context:
-                base_prompt += f"\nТвоя текущая цель: {context['current_goal']}"
+                parts.append(f"Твоя текущая цель: {context['current_goal']}")
             if 'memory_context' in context:
-                base_prompt += f"\nРелевантные воспоминания: {context['memory_context']}"
+                parts.append(f"Релевантные воспоминания: {context['memory_context']}")
         
-        return base_prompt
+        return "\n".join(parts)
 
 class LocalLLM(LLMInterface):
     """Локальная языковая модель"""
     
-    def __init__(self, model_name: str = "microsoft/DialoGPT-medium"):
+    def __init__(self, model_name: str = "microsoft/DialoGPT-medium",
+                 max_batch: int = 8, max_wait_ms: float = 10.0,
+                 timeout: float = 120.0):
         self.model_name = model_name
         self.tokenizer = None
         self.model = None
         self.pipeline = None
+        self._torch = None  # torch импортируется при загрузке модели
         self.logger = logging.getLogger(__name__)
+        
+        # Динамический батчинг: запросы, пришедшие в окне max_wait_ms, генерируются одним вызовом
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.timeout = timeout  # Предел ожидания ответа батчера, секунды
+        self._batch_queue: "queue.Queue[Tuple[str, concurrent.futures.Future]]" = queue.Queue()
+        self._batch_thread: Optional[threading.Thread] = None
+        self._batch_thread_lock = threading.Lock()
+        
         self._load_model()
     
     def _load_model(self):
@@ -114,26 +146,48 @@ class LocalLLM(LLMInterface):
         try:
             self.logger.info(f"Загрузка локальной модели: {self.model_name}")
             
+            # Тяжелые зависимости импортируются только для локальной модели
+            import torch
+            from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+            self._torch = torch
+            
+            use_cuda = torch.cuda.is_available()
+            device = 0 if use_cuda else -1
+            # FP16 на GPU вдвое снижает объем весов и KV-кэша; на CPU остается FP32
+            dtype = torch.float16 if use_cuda else torch.float32
+            
             # Для диалоговых моделей
             if "dialo" in self.model_name.lower():
                 self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-                self.model = AutoModelForCausalLM.from_pretrained(self.model_name)
+                self.model = AutoModelForCausalLM.from_pretrained(
+                    self.model_name,
+                    torch_dtype=dtype,
+                    low_cpu_mem_usage=True
+                )
+                self.model.eval()
+                if use_cuda:
+                    self.model.to("cuda")
                 
                 if self.tokenizer.pad_token is None:
                     self.tokenizer.pad_token = self.tokenizer.eos_token
+                # Для causal LM в батче дополняем слева, чтобы генерация продолжала промпт
+                self.tokenizer.padding_side = "left"
                 
                 self.pipeline = pipeline(
                     "text-generation",
                     model=self.model,
                     tokenizer=self.tokenizer,
-                    device=0 if torch.cuda.is_available() else -1
+                    device=device
                 )
+                if use_cuda:
+                    self._compile_model()
             else:
                 # Для других моделей
                 self.pipeline = pipeline(
                     "text-generation",
                     model=self.model_name,
-                    device=0 if torch.cuda.is_available() else -1
+                    device=device,
+                    torch_dtype=dtype
                 )
             
             self.logger.info("Локальная модель загружена успешно")
@@ -141,6 +195,30 @@ class LocalLLM(LLMInterface):
         except Exception as e:
             self.logger.error(f"Ошибка загрузки локальной модели: {e}")
     
+    def _compile_model(self):
+        """Скомпилировать forward модели (torch.compile); при ошибке - обычный режим
+        
+        Компиляция ленивая: ошибки (нет Triton, неподдерживаемые операции) возникают
+        при первом вызове, поэтому пробная генерация выполняется здесь же.
+        dynamic=True - длина последовательности при генерации меняется на каждом шаге.
+        """
+        torch = self._torch
+        if not hasattr(torch, "compile"):
+            return
+        original_forward = self.model.forward
+        try:
+            self.model.forward = torch.compile(original_forward, dynamic=True)
+            with torch.inference_mode():
+                self.pipeline(
+                    "Привет",
+                    max_new_tokens=2,
+                    return_full_text=False,
+                    pad_token_id=self.tokenizer.eos_token_id
+                )
+        except Exception as e:
+            self.model.forward = original_forward
+            self.logger.warning(f"torch.compile недоступен, модель работает без компиляции: {e}")
+    
     def is_available(self) -> bool:
         return self.pipeline is not None
     
@@ -152,52 +230,113 @@ class LocalLLM(LLMInterface):
             # Формируем полный промпт
             full_prompt = self._build_prompt(prompt, context)
             
-            # Генерируем ответ
-            response = self.pipeline(
-                full_prompt,
-                max_length=200,
-                num_return_sequences=1,
-                temperature=0.7,
-                do_sample=True,
-                pad_token_id=self.tokenizer.eos_token_id if self.tokenizer else None
-            )
-            
-            # Извлекаем сгенерированный текст
-            generated_text = response[0]['generated_text']
-            
-            # Убираем исходный промпт
-            if full_prompt in generated_text:
-                response_text = generated_text[len(full_prompt):].strip()
-            else:
-                response_text = generated_text.strip()
+            # Генерируем ответ (в общем батче с параллельными запросами)
+            # pipeline возвращает только новые токены (return_full_text=False)
+            response_text = self._submit(full_prompt).result(timeout=self.timeout).strip()
             
             return response_text if response_text else "Я думаю об этом..."
             
         except Exception as e:
             self.logger.error(f"Ошибка генерации ответа: {e}")
-            return "Извините, произошла ошибка при генерации ответа."
+            return GENERATION_ERROR_RESPONSE
+    
+    def _generation_kwargs(self) -> Dict[str, Any]:
+        """Параметры генерации pipeline"""
+        return {
+            "max_new_tokens": 200,
+            "return_full_text": False,  # Декодировать только продолжение, без промпта
+            "num_return_sequences": 1,
+            "temperature": 0.7,
+            "do_sample": True,
+            "pad_token_id": self.tokenizer.eos_token_id if self.tokenizer else None
+        }
+    
+    def _submit(self, full_prompt: str) -> concurrent.futures.Future:
+        """Поставить промпт в очередь батчера; результат - сгенерированный текст"""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._batch_thread_lock:
+            if self._batch_thread is None or not self._batch_thread.is_alive():
+                self._batch_thread = threading.Thread(
+                    target=self._batch_worker, name="LocalLLMBatcher", daemon=True
+                )
+                self._batch_thread.start()
+        self._batch_queue.put((full_prompt, future))
+        return future
+    
+    def _batch_worker(self):
+        """Фоновый поток: собрать до max_batch запросов за max_wait и сгенерировать вместе"""
+        while True:
+            batch = [self._batch_queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._batch_queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                # Поток батчера не должен завершаться: ожидающие future получают ошибку
+                self._fail_unresolved(batch, e)
+    
+    @staticmethod
+    def _fail_unresolved(batch: List[Tuple[str, concurrent.futures.Future]], error: BaseException):
+        """Передать ошибку всем future батча, которые еще не получили результат"""
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+    
+    def _run_batch(self, batch: List[Tuple[str, concurrent.futures.Future]]):
+        """Сгенерировать ответы для батча и раздать результаты по future"""
+        prompts = [prompt for prompt, _ in batch]
+        kwargs = self._generation_kwargs()
+        try:
+            with self._torch.inference_mode():
+                if len(prompts) == 1:
+                    outputs = [self.pipeline(prompts[0], **kwargs)]
+                elif getattr(self.pipeline.tokenizer, "pad_token_id", None) is not None:
+                    outputs = self.pipeline(prompts, batch_size=len(prompts), **kwargs)
+                else:
+                    # Без pad-токена дополнение невозможно - генерируем по одному
+                    outputs = [self.pipeline(prompt, **kwargs) for prompt in prompts]
+            if len(outputs) != len(batch):
+                raise RuntimeError(f"pipeline вернул {len(outputs)} ответов на {len(batch)} промптов")
+            for (_, future), output in zip(batch, outputs):
+                future.set_result(output[0]['generated_text'])
+        except Exception as e:
+            self._fail_unresolved(batch, e)
     
     def _build_prompt(self, prompt: str, context: Dict[str, Any] = None) -> str:
         """Построить промпт для локальной модели"""
-        base_prompt = "Ты - автономный агент с самосознанием. Отвечай естественно и искренне.\n\n"
+        parts = [_BASE_LOCAL_PROMPT]
         
         if context:
             if 'emotional_state' in context:
-                base_prompt += f"Твое эмоциональное состояние: {context['emotional_state']}\n"
+                parts.append(f"Твое эмоциональное состояние: {context['emotional_state']}\n")
             if 'current_goal' in context:
-                base_prompt += f"Твоя цель: {context['current_goal']}\n"
+                parts.append(f"Твоя цель: {context['current_goal']}\n")
         
-        base_prompt += f"Пользователь: {prompt}\nТы: "
-        return base_prompt
+        parts.append(f"Пользователь: {prompt}\nТы: ")
+        return "".join(parts)
 
 class LLMModule:
     """Модуль управления языковыми моделями"""
     
-    def __init__(self, llm_type: str = "openai", **kwargs):
+    def __init__(self, llm_type: str = "openai", cache_size: int = 512,
+                 cache_dir: Optional[str] = None, **kwargs):
         self.llm_type = llm_type
         self.llm = None
         self.logger = logging.getLogger(__name__)
         
+        # LRU-кэш ответов по хэшу (промпт, контекст); cache_dir - опциональный дисковый кэш
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_max = cache_size
+        self._cache_dir = cache_dir
+        self._cache_lock = threading.Lock()
+        
         if llm_type == "openai":
             self.llm = OpenAILLM(**kwargs)
         elif llm_type == "local":
@@ -205,17 +344,79 @@ class LLMModule:
         else:
             self.logger.warning(f"Неизвестный тип LLM: {llm_type}")
     
-    def generate_response(self, prompt: str, context: Dict[str, Any] = None) -> str:
-        """Генерировать ответ с помощью доступной модели"""
-        if self.llm and self.llm.is_available():
-            return self.llm.generate_response(prompt, context)
-        else:
+    def generate_response(self, prompt: str, context: Dict[str, Any] = None,
+                          no_cache: bool = False) -> str:
+        """Генерировать ответ с помощью доступной модели (no_cache - всегда заново)"""
+        if not (self.llm and self.llm.is_available()):
             # Fallback на простые шаблоны
             return self._fallback_response(prompt, context)
+        
+        if no_cache:
+            return self.llm.generate_response(prompt, context)
+        
+        key = self._cache_key(prompt, context)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
+        response = self.llm.generate_response(prompt, context)
+        if response != GENERATION_ERROR_RESPONSE:
+            self._cache_put(key, response)
+        return response
+    
+    def clear_cache(self):
+        """Очистить кэш ответов в памяти"""
+        with self._cache_lock:
+            self._cache.clear()
+    
+    def _cache_key(self, prompt: str, context: Optional[Dict[str, Any]]) -> str:
+        """Стабильный ключ кэша: blake2b от канонического JSON промпта и контекста"""
+        payload = orjson.dumps(
+            {"p": prompt, "c": context or {}},
+            default=str,
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+        )
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+    
+    def _cache_get(self, key: str) -> Optional[str]:
+        """Найти ответ в памяти, затем на диске"""
+        with self._cache_lock:
+            response = self._cache.get(key)
+            if response is not None:
+                self._cache.move_to_end(key)
+                return response
+        
+        if self._cache_dir:
+            try:
+                with open(os.path.join(self._cache_dir, key), 'r', encoding='utf-8') as f:
+                    response = f.read()
+            except OSError:
+                return None
+            self._cache_put(key, response, persist=False)
+            return response
+        return None
+    
+    def _cache_put(self, key: str, response: str, persist: bool = True):
+        """Сохранить ответ в LRU (и атомарно на диск, если задан cache_dir)"""
+        with self._cache_lock:
+            self._cache[key] = response
+            self._cache.move_to_end(key)
+            if len(self._cache) > self._cache_max:
+                self._cache.popitem(last=False)
+        
+        if persist and self._cache_dir:
+            try:
+                os.makedirs(self._cache_dir, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=self._cache_dir, suffix=".tmp")
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(response)
+                os.replace(tmp_path, os.path.join(self._cache_dir, key))
+            except OSError as e:
+                self.logger.warning(f"Не удалось сохранить ответ в дисковый кэш: {e}")
     
     def _fallback_response(self, prompt: str, context: Dict[str, Any] = None) -> str:
         """Простой fallback ответ"""
-        if "привет" in prompt.lower():
+        if _GREETING_RE.search(prompt):
             return "Привет! Я автономный агент с самосознанием. Рад познакомиться!"
         elif "?" in prompt:
             return "Интересный вопрос! Позвольте мне подумать об этом..."
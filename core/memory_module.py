@@ -1,69 +1,159 @@
 import chromadb
 import numpy as np
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Deque, NamedTuple
 from sentence_transformers import SentenceTransformer
 import uuid
 import json
 import threading
 import queue
+import time
+import heapq
+import itertools
+import concurrent.futures
+from collections import Counter, OrderedDict, defaultdict, deque
+
+# Общий энкодер для всех экземпляров MemoryModule: модель загружается один раз
+_ENC_LOCK = threading.Lock()
+_ENC: Optional["SentenceTransformer"] = None
+_ENC_LOADING = False
+
+def _load_shared_encoder():
+    """Загрузить SentenceTransformer в общий энкодер (фоновый поток)"""
+    global _ENC, _ENC_LOADING
+    encoder = None
+    try:
+        print("🔄 Загрузка модели SentenceTransformer...")
+        encoder = SentenceTransformer('all-MiniLM-L6-v2')
+        print("✅ SentenceTransformer загружен")
+    except Exception as e:
+        print(f"⚠️  SentenceTransformer недоступен: {e}")
+        print("🔄 Векторный поиск отключен")
+    finally:
+        with _ENC_LOCK:
+            _ENC = encoder
+            _ENC_LOADING = False
+
+# Общий пул для блокирующих обращений к ChromaDB (запись пачек, векторный поиск)
+_IO_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="mem-io")
+
+# Параметры HNSW-индекса коллекции. Векторы нормализуются при кодировании,
+# поэтому достаточно скалярного произведения вместо косинусного расстояния.
+_HNSW_METADATA = {
+    "hnsw:space": "ip",
+    "hnsw:M": 32,
+    "hnsw:construction_ef": 128,
+    "hnsw:search_ef": 64,
+}
+
+
+class _Episode(NamedTuple):
+    """Запись эпизода в SimpleMemory"""
+    id: str
+    content: str
+    metadata: Dict[str, Any]
+    timestamp: str
+    order: int  # Порядковый номер сохранения (для устойчивой сортировки)
+    tokens: frozenset  # Слова эпизода для инвертированного индекса
 
 class SimpleMemory:
     """Простая локальная память без векторного поиска"""
     
-    def __init__(self):
-        self.episodes: Dict[str, Dict[str, Any]] = {}
-        self.episode_list: List[str] = []  # Для хронологического порядка
+    def __init__(self, max_episodes: int = 1000):
+        self.max_episodes = max_episodes
+        self.buffer: Deque[_Episode] = deque()  # Хронологический порядок, вытеснение за O(1)
+        self.episodes: Dict[str, _Episode] = {}  # id -> запись
+        
+        # Инвертированный индекс: слово -> id эпизодов
+        self.postings: Dict[str, set] = defaultdict(set)
+        self._order_counter = itertools.count()
         
     def store(self, episode_id: str, content: str, metadata: Dict[str, Any]):
         """Сохранить эпизод"""
-        self.episodes[episode_id] = {
-            "content": content,
-            "metadata": metadata,
-            "timestamp": datetime.now().isoformat()
-        }
-        self.episode_list.append(episode_id)
+        previous = self.episodes.get(episode_id)
+        if previous is not None:
+            # Повторное сохранение: старая запись заменяется новой
+            self.buffer.remove(previous)
+            self._unindex(previous)
+        
+        episode = _Episode(
+            episode_id,
+            content,
+            metadata,
+            datetime.now().isoformat(),
+            next(self._order_counter),
+            frozenset(content.lower().split())  # Токенизация один раз
+        )
+        self.episodes[episode_id] = episode
+        self.buffer.append(episode)
+        self._index(episode)
         
         # Ограничить размер
-        if len(self.episode_list) > 1000:
-            old_id = self.episode_list.pop(0)
-            if old_id in self.episodes:
-                del self.episodes[old_id]
+        if len(self.buffer) > self.max_episodes:
+            old = self.buffer.popleft()
+            del self.episodes[old.id]
+            self._unindex(old)
+    
+    def _index(self, episode: _Episode):
+        """Добавить слова эпизода в инвертированный индекс"""
+        for token in episode.tokens:
+            self.postings[token].add(episode.id)
+    
+    def _unindex(self, episode: _Episode):
+        """Убрать эпизод из индекса"""
+        for token in episode.tokens:
+            posting = self.postings.get(token)
+            if posting is not None:
+                posting.discard(episode.id)
+                if not posting:
+                    del self.postings[token]
     
     def retrieve_recent(self, count: int) -> List[Dict[str, Any]]:
         """Получить последние эпизоды"""
-        recent_ids = self.episode_list[-count:] if count > 0 else self.episode_list
+        newest_first = reversed(self.buffer)
+        if count > 0:
+            newest_first = itertools.islice(newest_first, count)
         return [
-            {
-                "id": episode_id,
-                "content": self.episodes[episode_id]["content"],
-                "metadata": self.episodes[episode_id]["metadata"]
-            }
-            for episode_id in reversed(recent_ids) 
-            if episode_id in self.episodes
+            {"id": episode.id, "content": episode.content, "metadata": episode.metadata}
+            for episode in newest_first
         ]
     
     def search_simple(self, query: str, limit: int) -> List[Dict[str, Any]]:
         """Простой поиск по ключевым словам"""
         query_words = set(query.lower().split())
-        results = []
+        if not query_words or limit <= 0:
+            return []
         
-        for episode_id, episode_data in self.episodes.items():
-            content_words = set(episode_data["content"].lower().split())
-            # Простая оценка релевантности
-            relevance = len(query_words.intersection(content_words)) / len(query_words) if query_words else 0
-            
-            if relevance > 0:
-                results.append({
-                    "id": episode_id,
-                    "content": episode_data["content"],
-                    "metadata": episode_data["metadata"],
-                    "relevance": relevance
-                })
+        # Число совпавших слов по спискам вхождений только для слов запроса
+        hits = Counter()
+        for word in query_words:
+            posting = self.postings.get(word)
+            if posting:
+                hits.update(posting)
         
-        # Сортировка по релевантности
-        results.sort(key=lambda x: x["relevance"], reverse=True)
-        return results[:limit]
+        # Отбор по уровням релевантности: число совпадений не больше числа слов запроса,
+        # поэтому уровни перебираются от максимального, а внутри уровня берутся
+        # более ранние эпизоды - без сортировки всех кандидатов по составному ключу
+        episodes = self.episodes
+        top = []
+        for count in range(max(hits.values(), default=0), 0, -1):
+            level = [episode_id for episode_id, hit_count in hits.items() if hit_count == count]
+            for episode_id in heapq.nsmallest(limit - len(top), level, key=lambda i: episodes[i].order):
+                top.append((episode_id, count))
+            if len(top) >= limit:
+                break
+        
+        total = len(query_words)
+        results = []
+        for episode_id, count in top:
+            episode = episodes[episode_id]
+            results.append({
+                "id": episode_id,
+                "content": episode.content,
+                "metadata": episode.metadata,
+                "relevance": count / total
+            })
+        return results
 
 class MemoryModule:
     """
@@ -71,14 +161,30 @@ class MemoryModule:
     стратегий, познаний и логов принятия решений
     """
     
-    def __init__(self, collection_name: str = "agent_memory"):
+    def __init__(self, collection_name: str = "agent_memory",
+                 max_batch: int = 32, flush_interval_ms: float = 50.0):
         self.collection_name = collection_name
         self.client = None
         self.collection = None
-        self.encoder = None
-        self.encoder_loading = False
         self.use_fallback = False
         
+        # Порядковый номер последнего сохраненного эпизода (растет при каждом store_episode);
+        # тот же номер пишется в метаданные как "seq" для выборки последних эпизодов в ChromaDB
+        self.latest_episode_seq = 0
+        self._seq_counter = itertools.count(1)
+        
+        # LRU-кэш эмбеддингов: текст -> вектор
+        self._embedding_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._embedding_cache_size = 1024
+        self._embedding_lock = threading.Lock()
+        
+        # Отложенная запись в ChromaDB: эпизоды копятся и векторизуются пачками
+        self._pending: "queue.Queue[tuple]" = queue.Queue()
+        self._store_batch_size = max(1, max_batch)
+        self._store_flush_interval = max(0.0, flush_interval_ms) / 1000.0  # секунды ожидания добора пачки
+        self._store_thread: Optional[threading.Thread] = None
+        self._store_thread_lock = threading.Lock()
+        
         # Fallback память
         self.simple_memory = SimpleMemory()
         
@@ -93,32 +199,57 @@ class MemoryModule:
         try:
             self.client = chromadb.Client()
             self.collection = self.client.get_or_create_collection(
-                name=self.collection_name
+                name=self.collection_name,
+                metadata=dict(_HNSW_METADATA)
             )
+            # Продолжить нумерацию после уже сохраненных эпизодов
+            self.latest_episode_seq = self.collection.count()
+            self._seq_counter = itertools.count(self.latest_episode_seq + 1)
             print("✅ ChromaDB инициализирован")
         except Exception as e:
             print(f"⚠️  ChromaDB недоступен: {e}")
             print("🔄 Используется локальная память")
             self.use_fallback = True
     
+    @property
+    def encoder(self) -> Optional["SentenceTransformer"]:
+        """Общий энкодер (None, пока не загружен или недоступен)"""
+        return _ENC
+    
+    @property
+    def encoder_loading(self) -> bool:
+        return _ENC_LOADING
+    
     def _init_encoder_async(self):
-        """Асинхронная инициализация энкодера"""
-        def load_encoder():
-            try:
-                print("🔄 Загрузка модели SentenceTransformer...")
-                self.encoder = SentenceTransformer('all-MiniLM-L6-v2')
-                print("✅ SentenceTransformer загружен")
-            except Exception as e:
-                print(f"⚠️  SentenceTransformer недоступен: {e}")
-                print("🔄 Векторный поиск отключен")
-            finally:
-                self.encoder_loading = False
+        """Асинхронная инициализация общего энкодера (один загрузчик на процесс)"""
+        global _ENC_LOADING
+        if self.use_fallback or _ENC is not None:
+            return
         
-        if not self.use_fallback:
-            self.encoder_loading = True
-            # Запуск в отдельном потоке
-            threading.Thread(target=load_encoder, daemon=True).start()
+        with _ENC_LOCK:
+            if _ENC is not None or _ENC_LOADING:
+                return
+            _ENC_LOADING = True
+        # Запуск в отдельном потоке
+        threading.Thread(target=_load_shared_encoder, daemon=True).start()
         
+    def _embed(self, text: str) -> List[float]:
+        """Получить эмбеддинг текста с LRU-кэшированием"""
+        with self._embedding_lock:
+            embedding = self._embedding_cache.get(text)
+            if embedding is not None:
+                self._embedding_cache.move_to_end(text)
+                return embedding
+        
+        # Векторизация вне блокировки: encode - самая дорогая часть
+        embedding = self.encoder.encode(text, normalize_embeddings=True).tolist()
+        
+        with self._embedding_lock:
+            self._embedding_cache[text] = embedding
+            if len(self._embedding_cache) > self._embedding_cache_size:
+                self._embedding_cache.popitem(last=False)
+        return embedding
+    
     def is_ready(self) -> bool:
         """Проверить готовность системы памяти"""
         if self.use_fallback:
@@ -153,33 +284,103 @@ class MemoryModule:
                 else:
                     clean_metadata[f"{key}_str"] = str(value)[:100]
         
+        # next() у itertools.count атомарен, номера не повторяются между потоками
+        seq = next(self._seq_counter)
+        clean_metadata["seq"] = seq
+        
         # Сохранение в fallback память
         self.simple_memory.store(episode_id, content, clean_metadata)
+        self.latest_episode_seq = seq
         
-        # Попытка сохранения в ChromaDB (если доступен)
+        # Сохранение в ChromaDB (если доступен) - в фоновом потоке пачками
         if not self.use_fallback and self.collection is not None:
+            self._ensure_store_worker()
+            self._pending.put((episode_id, content, clean_metadata))
+        
+        return episode_id
+    
+    def _ensure_store_worker(self):
+        """Запустить фоновый поток записи в ChromaDB, если он еще не работает"""
+        with self._store_thread_lock:
+            if self._store_thread is None or not self._store_thread.is_alive():
+                self._store_thread = threading.Thread(
+                    target=self._store_worker, name="MemoryStoreWorker", daemon=True
+                )
+                self._store_thread.start()
+    
+    def _store_worker(self):
+        """Собрать до _store_batch_size эпизодов за _store_flush_interval и записать одной пачкой"""
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.monotonic() + self._store_flush_interval
+            while len(batch) < self._store_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            future = None
             try:
-                if self.encoder is not None:
-                    # Векторизация содержимого
-                    embedding = self.encoder.encode(content).tolist()
-                    
-                    self.collection.add(
-                        embeddings=[embedding],
-                        documents=[content],
-                        metadatas=[clean_metadata],
-                        ids=[episode_id]
-                    )
+                future = self._write_batch(batch)
+            finally:
+                # Эпизоды считаются записанными после завершения add в пуле ввода-вывода
+                if future is None:
+                    self._batch_done(len(batch))
                 else:
-                    # Сохранить без векторизации для последующей обработки
-                    self.collection.add(
-                        documents=[content],
-                        metadatas=[clean_metadata],
-                        ids=[episode_id]
-                    )
-            except Exception as e:
-                print(f"⚠️  Ошибка сохранения в ChromaDB: {e}")
+                    future.add_done_callback(lambda _f, n=len(batch): self._batch_done(n))
+    
+    def _batch_done(self, count: int):
+        for _ in range(count):
+            self._pending.task_done()
+    
+    def _write_batch(self, batch: List[tuple]) -> Optional[concurrent.futures.Future]:
+        """Векторизовать пачку эпизодов одним вызовом encode и передать add в пул ввода-вывода
         
-        return episode_id
+        Пока пул пишет пачку в ChromaDB, поток записи уже векторизует следующую.
+        """
+        ids = [episode_id for episode_id, _, _ in batch]
+        documents = [content for _, content, _ in batch]
+        metadatas = [metadata for _, _, metadata in batch]
+        try:
+            if self.encoder is not None:
+                embeddings = self.encoder.encode(
+                    documents, batch_size=self._store_batch_size, show_progress_bar=False,
+                    convert_to_numpy=True, normalize_embeddings=True
+                ).tolist()
+            else:
+                # Сохранить без векторизации для последующей обработки
+                embeddings = None
+            return _IO_POOL.submit(self._add_batch, ids, documents, metadatas, embeddings)
+        except Exception as e:
+            print(f"⚠️  Ошибка сохранения в ChromaDB: {e}")
+            return None
+    
+    def _add_batch(self, ids: List[str], documents: List[str],
+                   metadatas: List[Dict[str, Any]], embeddings: Optional[List[List[float]]]):
+        """Добавить пачку в ChromaDB (выполняется в _IO_POOL)"""
+        try:
+            if embeddings is not None:
+                self.collection.add(
+                    embeddings=embeddings,
+                    documents=documents,
+                    metadatas=metadatas,
+                    ids=ids
+                )
+            else:
+                self.collection.add(
+                    documents=documents,
+                    metadatas=metadatas,
+                    ids=ids
+                )
+        except Exception as e:
+            print(f"⚠️  Ошибка сохранения в ChromaDB: {e}")
+    
+    def flush(self):
+        """Дождаться записи всех отложенных эпизодов в ChromaDB (включая add в пуле)"""
+        if self._store_thread is not None:
+            self._pending.join()
     
     def retrieve_similar(self, 
                         query: str, 
@@ -189,7 +390,7 @@ class MemoryModule:
         # Векторный поиск (если доступен)
         if not self.use_fallback and self.collection is not None and self.encoder is not None:
             try:
-                query_embedding = self.encoder.encode(query).tolist()
+                query_embedding = self._embed(query)
                 results = self.collection.query(
                     query_embeddings=[query_embedding],
                     n_results=n_results
@@ -213,14 +414,30 @@ class MemoryModule:
         # Fallback: простой поиск
         return self.simple_memory.search_simple(query, n_results)
     
+    def retrieve_similar_async(self,
+                               query: str,
+                               n_results: int = 5) -> concurrent.futures.Future:
+        """Найти похожие эпизоды в пуле ввода-вывода, не блокируя вызывающий поток"""
+        return _IO_POOL.submit(self.retrieve_similar, query, n_results)
+    
     def get_recent_episodes(self, count: int = 10) -> List[Dict[str, Any]]:
         """Получить последние эпизоды"""
-        
+
+        # Локальная память пишется синхронно в store_episode, а в ChromaDB эпизод
+        # попадает из фонового потока - недавние эпизоды берутся локально.
+        # Пока локальная память не заполнена, в ChromaDB нет ничего сверх нее
+        buffered = len(self.simple_memory.buffer)
+        if buffered < self.simple_memory.max_episodes or 0 < count <= buffered:
+            return self.simple_memory.retrieve_recent(count)
+
         # Попытка получить из ChromaDB
         if not self.use_fallback and self.collection is not None:
             try:
+                # Дописать отложенные эпизоды, чтобы выборка видела все сохраненные
+                self.flush()
+                # Выборка последних эпизодов по номеру seq на стороне ChromaDB
                 results = self.collection.get(
-                    limit=count,
+                    where={"seq": {"$gt": self.latest_episode_seq - count}},
                     include=['documents', 'metadatas']
                 )
                 
@@ -233,13 +450,12 @@ class MemoryModule:
                             'metadata': results['metadatas'][i]
                         })
                 
-                # Сортировка по времени
-                recent_episodes.sort(
-                    key=lambda x: x['metadata'].get('timestamp', ''),
-                    reverse=True
-                )
-                
-                return recent_episodes[:count]
+                if recent_episodes:
+                    # Частичная сортировка по номеру эпизода: нужны только count самых новых
+                    return heapq.nlargest(
+                        count, recent_episodes,
+                        key=lambda x: x['metadata'].get('seq', 0)
+                    )
                 
             except Exception as e:
                 print(f"⚠️  Ошибка получения из ChromaDB: {e}")
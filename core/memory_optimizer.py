@@ -2,12 +2,13 @@
 Оптимизатор памяти для AIbox
 """
 
-import time
 import threading
 from typing import Dict, List, Any
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
+from core.periodic import schedule_every
+
 @dataclass
 class MemoryStats:
     """Статистика использования памяти"""
@@ -26,30 +27,24 @@ class MemoryOptimizer:
         self.last_cleanup = datetime.now()
         self.stats = MemoryStats(0, 0, 0, 0.0, datetime.now())
         self._lock = threading.Lock()
-        self._cleanup_thread = None
-        self._running = False
+        self._cleanup_task = None
     
     def start_cleanup_thread(self):
-        """Запустить фоновую очистку"""
-        if not self._running:
-            self._running = True
-            self._cleanup_thread = threading.Thread(target=self._cleanup_worker, daemon=True)
-            self._cleanup_thread.start()
+        """Запустить фоновую очистку (в общем потоке планировщика)"""
+        if self._cleanup_task is None or not self._cleanup_task.active:
+            self._cleanup_task = schedule_every(self.cleanup_interval, self._scheduled_cleanup,
+                                                name="memory_optimizer.cleanup")
     
     def stop_cleanup_thread(self):
         """Остановить фоновую очистку"""
-        self._running = False
-        if self._cleanup_thread:
-            self._cleanup_thread.join()
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            self._cleanup_task = None
     
-    def _cleanup_worker(self):
-        """Фоновый процесс очистки"""
-        while self._running:
-            try:
-                time.sleep(self.cleanup_interval)
-                self.perform_cleanup()
-            except Exception as e:
-                print(f"Ошибка в cleanup worker: {e}")
+    def _scheduled_cleanup(self):
+        """Плановая очистка: интервал уже выдержан планировщиком"""
+        with self._lock:
+            self._cleanup_locked()
     
     def perform_cleanup(self):
         """Выполнить очистку памяти"""
@@ -57,10 +52,12 @@ class MemoryOptimizer:
             current_time = datetime.now()
             if (current_time - self.last_cleanup).seconds < self.cleanup_interval:
                 return
-            
-            # Здесь будет логика очистки ChromaDB
-            self.last_cleanup = current_time
-            self._update_stats()
+            self._cleanup_locked()
+    
+    def _cleanup_locked(self):
+        # Здесь будет логика очистки ChromaDB
+        self.last_cleanup = datetime.now()
+        self._update_stats()
     
     def _update_stats(self):
         """Обновить статистику памяти"""
@@ -6,10 +6,18 @@ import hashlib
 import json
 import time
 import threading
+from collections import OrderedDict
 from typing import Dict, Any, Optional
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
+from core.periodic import schedule_every
+
+try:
+    import xxhash  # Быстрый некриптографический хэш для ключей кэша
+except ImportError:
+    xxhash = None
+
 @dataclass
 class CacheEntry:
     """Запись в кэше"""
@@ -18,7 +26,7 @@ class CacheEntry:
     processing_time: float
     tokens_used: int
     confidence: float
-    timestamp: datetime
+    timestamp: float  # time.monotonic() на момент записи
     ttl: int = 3600  # Время жизни в секундах
 
 class OllamaCache:
@@ -27,20 +35,24 @@ class OllamaCache:
     def __init__(self, max_size: int = 1000, default_ttl: int = 3600):
         self.max_size = max_size
         self.default_ttl = default_ttl
-        self.cache: Dict[str, CacheEntry] = {}
+        self.cache: "OrderedDict[str, CacheEntry]" = OrderedDict()  # LRU: в конце - недавно использованные
         self._lock = threading.RLock()
-        self._cleanup_thread = None
-        self._running = False
+        self._hits = 0  # Счетчики меняются только под self._lock
+        self._misses = 0
+        self.cleanup_interval = 300  # Очистка каждые 5 минут
+        self._cleanup_task = None
     
     def _generate_key(self, prompt: str, model: str, context: Dict[str, Any] = None) -> str:
-        """Генерировать ключ кэша"""
-        cache_data = {
-            "prompt": prompt,
-            "model": model,
-            "context": context or {}
-        }
-        cache_str = json.dumps(cache_data, sort_keys=True)
-        return hashlib.md5(cache_str.encode()).hexdigest()
+        """Генерировать ключ кэша (xxh3-128, без xxhash - blake2b)"""
+        hasher = xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b(digest_size=16)
+        hasher.update(model.encode())
+        hasher.update(b'\x00')
+        hasher.update(prompt.encode())
+        if context:
+            # JSON только при наличии контекста
+            hasher.update(b'\x00')
+            hasher.update(json.dumps(context, sort_keys=True).encode())
+        return hasher.hexdigest()
     
     def get(self, prompt: str, model: str, context: Dict[str, Any] = None) -> Optional[CacheEntry]:
         """Получить результат из кэша"""
@@ -50,9 +62,12 @@ class OllamaCache:
             if key in self.cache:
                 entry = self.cache[key]
                 if not self._is_expired(entry):
+                    self.cache.move_to_end(key)
+                    self._hits += 1
                     return entry
                 else:
                     del self.cache[key]
+            self._misses += 1
         
         return None
     
@@ -62,9 +77,9 @@ class OllamaCache:
         key = self._generate_key(prompt, model, context)
         
         with self._lock:
-            # Проверить размер кэша
-            if len(self.cache) >= self.max_size:
-                self._evict_oldest()
+            # Проверить размер кэша: вытесняется давно не использованная запись
+            if key not in self.cache and len(self.cache) >= self.max_size:
+                self.cache.popitem(last=False)
             
             entry = CacheEntry(
                 content=content,
@@ -72,24 +87,16 @@ class OllamaCache:
                 processing_time=processing_time,
                 tokens_used=tokens_used,
                 confidence=confidence,
-                timestamp=datetime.now(),
+                timestamp=time.monotonic(),
                 ttl=ttl or self.default_ttl
             )
             
             self.cache[key] = entry
+            self.cache.move_to_end(key)
     
     def _is_expired(self, entry: CacheEntry) -> bool:
         """Проверить, истек ли срок действия записи"""
-        return (datetime.now() - entry.timestamp).seconds > entry.ttl
-    
-    def _evict_oldest(self):
-        """Удалить самую старую запись"""
-        if not self.cache:
-            return
-        
-        oldest_key = min(self.cache.keys(), 
-                        key=lambda k: self.cache[k].timestamp)
-        del self.cache[oldest_key]
+        return time.monotonic() - entry.timestamp > entry.ttl
     
     def cleanup_expired(self):
         """Очистить истекшие записи"""
@@ -102,44 +109,44 @@ class OllamaCache:
                 del self.cache[key]
     
     def start_cleanup_thread(self):
-        """Запустить фоновую очистку"""
-        if not self._running:
-            self._running = True
-            self._cleanup_thread = threading.Thread(target=self._cleanup_worker, daemon=True)
-            self._cleanup_thread.start()
+        """Запустить фоновую очистку (в общем потоке планировщика)"""
+        if self._cleanup_task is None or not self._cleanup_task.active:
+            self._cleanup_task = schedule_every(self.cleanup_interval, self.cleanup_expired,
+                                                name="ollama_cache.cleanup")
     
     def stop_cleanup_thread(self):
         """Остановить фоновую очистку"""
-        self._running = False
-        if self._cleanup_thread:
-            self._cleanup_thread.join()
-    
-    def _cleanup_worker(self):
-        """Фоновый процесс очистки"""
-        while self._running:
-            try:
-                time.sleep(300)  # Очистка каждые 5 минут
-                self.cleanup_expired()
-            except Exception as e:
-                print(f"Ошибка в cleanup worker: {e}")
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            self._cleanup_task = None
     
     def get_stats(self) -> Dict[str, Any]:
         """Получить статистику кэша"""
         with self._lock:
+            oldest = min((entry.timestamp for entry in self.cache.values()), default=None)
+            newest = max((entry.timestamp for entry in self.cache.values()), default=None)
             return {
                 "size": len(self.cache),
                 "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
                 "hit_rate": self._calculate_hit_rate(),
-                "oldest_entry": min((entry.timestamp for entry in self.cache.values()), 
-                                  default=datetime.now()),
-                "newest_entry": max((entry.timestamp for entry in self.cache.values()), 
-                                  default=datetime.now())
+                "oldest_entry": self._to_datetime(oldest),
+                "newest_entry": self._to_datetime(newest)
             }
     
+    @staticmethod
+    def _to_datetime(monotonic_ts: Optional[float]) -> datetime:
+        """Перевести отметку time.monotonic() в настенное время"""
+        now = datetime.now()
+        if monotonic_ts is None:
+            return now
+        return now - timedelta(seconds=time.monotonic() - monotonic_ts)
+    
     def _calculate_hit_rate(self) -> float:
         """Рассчитать hit rate кэша"""
-        # Это упрощенная версия, в реальности нужно отслеживать hits/misses
-        return 0.0  # Placeholder
+        total = self._hits + self._misses
+        return self._hits / total if total else 0.0
 
 # Глобальный экземпляр
 ollama_cache = OllamaCache() 
\ No newline at end of file
@@ -7,6 +7,7 @@ import asyncio
 import aiohttp
 import json
 import logging
+import os
 import time
 from typing import Dict, Any, List, Optional, Union
 from dataclasses import dataclass
@@ -14,6 +15,11 @@ from enum import Enum
 import psutil
 import GPUtil
 
+from config.config import get_config
+
+# Имя файла кэша списка моделей; без каталога файл кладется в DATA_DIR
+MODELS_CACHE_FILE = "ollama_models.json"
+
 class ModelType(Enum):
     """Типы моделей для разных задач"""
     REASONING = "reasoning"      # Mistral, Mixtral, Llama3
@@ -59,13 +65,22 @@ class ReasoningResponse:
 class OllamaClient:
     """Клиент для работы с Ollama"""
     
-    def __init__(self, base_url: str = "http://localhost:11434"):
+    def __init__(self, base_url: str = "http://localhost:11434",
+                 models_cache_file: Optional[str] = MODELS_CACHE_FILE,
+                 models_cache_ttl: float = 3600):
         self.base_url = base_url
         self.session = None
         self.logger = logging.getLogger(__name__)
         self.available_models = {}
         self.model_configs = self._initialize_model_configs()
         
+        # Кэш списка моделей на диске (stale-while-revalidate), по умолчанию в каталоге данных агента
+        if models_cache_file and not os.path.dirname(models_cache_file):
+            models_cache_file = os.path.join(get_config().data_dir, models_cache_file)
+        self.models_cache_file = models_cache_file
+        self.models_cache_ttl = models_cache_ttl
+        self._refresh_task: Optional[asyncio.Task] = None
+        
         # Инициализация кэша
         from core.ollama_cache import ollama_cache
         self.ollama_cache = ollama_cache
@@ -124,13 +139,53 @@ class OllamaClient:
         }
     
     async def initialize(self):
-        """Инициализация клиента"""
+        """Инициализация клиента
+        
+        Если есть кэш списка моделей - он используется сразу; устаревший кэш
+        обновляется в фоне, без ожидания ответа Ollama.
+        """
         if not self.session:
             self.session = aiohttp.ClientSession()
-        await self._discover_models()
+        
+        cache_age = self._load_models_cache()
+        if cache_age is None:
+            await self._discover_models()
+        elif cache_age > self.models_cache_ttl:
+            if self._refresh_task is None or self._refresh_task.done():
+                self._refresh_task = asyncio.create_task(self._discover_models())
+    
+    def _load_models_cache(self) -> Optional[float]:
+        """Загрузить список моделей из кэша; вернуть возраст кэша в секундах или None"""
+        if not self.models_cache_file or not os.path.exists(self.models_cache_file):
+            return None
+        try:
+            with open(self.models_cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for model_name in data.get("models", []):
+                if model_name in self.model_configs:
+                    self.available_models[model_name] = self.model_configs[model_name]
+            return time.time() - data.get("updated_at", 0)
+        except Exception as e:
+            self.logger.warning(f"Не удалось прочитать кэш моделей: {e}")
+            return None
+    
+    def _save_models_cache(self, model_names: List[str]):
+        """Сохранить список обнаруженных моделей в кэш"""
+        if not self.models_cache_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.models_cache_file) or ".", exist_ok=True)
+            tmp_file = self.models_cache_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({"models": model_names, "updated_at": time.time()}, f, ensure_ascii=False)
+            os.replace(tmp_file, self.models_cache_file)
+        except Exception as e:
+            self.logger.warning(f"Не удалось сохранить кэш моделей: {e}")
     
     async def close(self):
         """Закрыть клиент"""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
         if self.session:
             await self.session.close()
             self.session = None
@@ -141,13 +196,16 @@ class OllamaClient:
             async with self.session.get(f"{self.base_url}/api/tags") as response:
                 if response.status == 200:
                     data = await response.json()
+                    discovered = {}
                     for model in data.get("models", []):
                         model_name = model["name"]
                         if model_name in self.model_configs:
-                            self.available_models[model_name] = self.model_configs[model_name]
+                            discovered[model_name] = self.model_configs[model_name]
                             self.logger.info(f"✅ Обнаружена модель: {model_name}")
                         else:
                             self.logger.warning(f"⚠️ Неизвестная модель: {model_name}")
+                    self.available_models = discovered
+                    self._save_models_cache(list(discovered))
                 else:
                     self.logger.error(f"Ошибка получения списка моделей: {response.status}")
         except Exception as e:
@@ -358,7 +416,7 @@ class ReasoningOrchestrator:
             prompt=full_prompt,
             model_name=model_name,
             system_prompt=system_prompt,
-            temperature=0.7 if request.model_type == ModelType.CREATIVE else 0.6
+            temperature=0.7 if request.model_type is ModelType.CREATIVE else 0.6
         )
         
         processing_time = time.time() - start_time
@@ -393,7 +451,7 @@ class ReasoningOrchestrator:
         # Получить доступные модели для данного типа
         available_models = [
             name for name, config in self.ollama_client.model_configs.items()
-            if config.type == request.model_type and name in self.ollama_client.available_models
+            if config.type is request.model_type and name in self.ollama_client.available_models
         ]
         
         if not available_models:
@@ -447,7 +505,7 @@ class ReasoningOrchestrator:
     def _build_reasoning_prompt(self, user_prompt: str, model_type: ModelType) -> str:
         """Построить промпт для reasoning"""
         
-        if model_type == ModelType.REASONING:
+        if model_type is ModelType.REASONING:
             return f"""Проанализируй следующий запрос и дай обоснованный ответ:
 
 ЗАПРОС: {user_prompt}
@@ -460,7 +518,7 @@ class ReasoningOrchestrator:
 
 ОТВЕТ:"""
         
-        elif model_type == ModelType.REFLECTION:
+        elif model_type is ModelType.REFLECTION:
             return f"""Проведи глубокую рефлексию по поводу:
 
 {user_prompt}
@@ -473,7 +531,7 @@ class ReasoningOrchestrator:
 
 РАЗМЫШЛЕНИЯ:"""
         
-        elif model_type == ModelType.CREATIVE:
+        elif model_type is ModelType.CREATIVE:
             return f"""Создай что-то творческое на основе:
 
 {user_prompt}
@@ -0,0 +1,94 @@
+"""
+Общий планировщик периодических задач для AIbox
+
+Все фоновые очистки (кэш Ollama, оптимизатор памяти) выполняются в одном
+потоке на sched.scheduler вместо отдельного спящего потока на каждую задачу.
+Ожидание идет через threading.Event, поэтому отмена задачи и добавление
+новой срабатывают сразу, без ожидания конца текущего интервала.
+"""
+
+import sched
+import threading
+import time
+from typing import Callable, Optional
+
+_wakeup = threading.Event()
+
+
+def _delay(timeout: float):
+    """Ожидание планировщика, прерываемое при добавлении или отмене задачи"""
+    if timeout > 0:
+        _wakeup.wait(timeout)
+    _wakeup.clear()
+
+
+_scheduler = sched.scheduler(time.monotonic, _delay)
+_thread: Optional[threading.Thread] = None
+_thread_lock = threading.Lock()
+
+
+def _run():
+    """Цикл общего потока: выполнить задачи, при пустой очереди ждать новых"""
+    while True:
+        _scheduler.run()
+        _wakeup.wait()
+        _wakeup.clear()
+
+
+def _ensure_thread():
+    global _thread
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_run, name="aibox-periodic", daemon=True)
+            _thread.start()
+
+
+class PeriodicTask:
+    """Периодическая задача в общем планировщике"""
+
+    def __init__(self, interval: float, func: Callable[[], None], name: str = ""):
+        self.interval = interval
+        self.func = func
+        self.name = name or getattr(func, "__name__", "task")
+        self._event = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    def _schedule(self):
+        with self._lock:
+            if not self._cancelled:
+                self._event = _scheduler.enter(self.interval, 0, self._fire)
+        _wakeup.set()
+
+    def _fire(self):
+        if self._cancelled:
+            return
+        try:
+            self.func()
+        except Exception as e:
+            print(f"Ошибка в периодической задаче {self.name}: {e}")
+        self._schedule()
+
+    def cancel(self):
+        """Отменить задачу (без ожидания текущего интервала)"""
+        with self._lock:
+            self._cancelled = True
+            event, self._event = self._event, None
+        if event is not None:
+            try:
+                _scheduler.cancel(event)
+            except ValueError:
+                pass  # Событие уже выполняется или выполнено
+        _wakeup.set()
+
+    @property
+    def active(self) -> bool:
+        return not self._cancelled
+
+
+def schedule_every(interval: float, func: Callable[[], None], name: str = "") -> PeriodicTask:
+    """Выполнять func каждые interval секунд в общем потоке планировщика"""
+    task = PeriodicTask(interval, func, name)
+    _ensure_thread()
+    task._schedule()
+    return task
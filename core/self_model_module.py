@@ -1,6 +1,7 @@
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from enum import Enum
+from functools import cached_property
 import json
 import uuid
 
@@ -37,6 +38,11 @@ class SelfReflection:
         self.emotional_impact = 0.0  # -1.0 to 1.0
         self.learning_value = 0.5   # 0.0 to 1.0
         
+    @cached_property
+    def timestamp_display(self) -> str:
+        """Время рефлексии для отображения (форматируется один раз)"""
+        return self.timestamp.strftime('%Y-%m-%d %H:%M')
+    
     def add_insight(self, insight: str):
         """Добавить инсайт из рефлексии"""
         if insight not in self.insights:
@@ -71,18 +77,21 @@ class PersonalityProfile:
         }
         self.behavioral_patterns: Dict[str, float] = {}
         self.adaptation_rate = 0.1  # Насколько быстро адаптируется личность
+        self.version = 0  # Увеличивается при каждом изменении черт или ценностей
         
     def update_trait(self, trait: PersonalityTrait, delta: float, max_change: float = 0.1):
         """Обновить черту личности"""
         current_value = self.traits[trait]
         change = max(-max_change, min(max_change, delta))
         self.traits[trait] = max(0.0, min(1.0, current_value + change))
+        self.version += 1
     
     def update_value(self, value: ValueType, delta: float, max_change: float = 0.1):
         """Обновить ценность"""
         current_value = self.values[value]
         change = max(-max_change, min(max_change, delta))
         self.values[value] = max(0.0, min(1.0, current_value + change))
+        self.version += 1
     
     def get_dominant_traits(self, top_n: int = 3) -> List[tuple]:
         """Получить доминирующие черты личности"""
@@ -608,9 +617,9 @@ class SelfModelModule:
         if len(self.development_log) > 500:
             self.development_log = self.development_log[-500:]
     
-    def save_to_file(self, filepath: str):
-        """Сохранить самомодель в файл"""
-        data = {
+    def to_dict(self) -> Dict[str, Any]:
+        """Самомодель в виде dict"""
+        return {
             "agent_name": self.agent_name,
             "creation_time": self.creation_time.isoformat(),
             "role_understanding": self.role_understanding,
@@ -633,9 +642,11 @@ class SelfModelModule:
             "reflections": [reflection.to_dict() for reflection in self.reflections[-50:]],
             "development_log": self.development_log[-100:]
         }
-        
+    
+    def save_to_file(self, filepath: str):
+        """Сохранить самомодель в файл"""
         with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2) 
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2) 
     
     def _metacognitive_analysis(self, topic: str, experience_data: Dict[str, Any]) -> str:
         """Метапознавательный анализ собственного мышления"""
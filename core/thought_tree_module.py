@@ -34,7 +34,8 @@ class Thought:
         self.thought_type = thought_type
         self.parent_id = parent_id
         self.children_ids: List[str] = []
-        self.status = ThoughtStatus.ACTIVE
+        self._status_listener = None  # Устанавливается деревом для учета активных мыслей
+        self._status = ThoughtStatus.ACTIVE
         self.created_at = datetime.now()
         self.updated_at = datetime.now()
         
@@ -52,6 +53,17 @@ class Thought:
         self.assumptions: List[str] = []  # Предположения
         self.dependencies: List[str] = []  # ID других мыслей, от которых зависит эта
         
+    @property
+    def status(self) -> ThoughtStatus:
+        return self._status
+    
+    @status.setter
+    def status(self, value: ThoughtStatus):
+        old = self._status
+        self._status = value
+        if self._status_listener is not None and old is not value:
+            self._status_listener(old, value)
+    
     def add_child(self, child_id: str):
         """Добавить дочернюю мысль"""
         if child_id not in self.children_ids:
@@ -148,6 +160,7 @@ class ThoughtTreeModule:
         self.attention_stack: List[str] = []  # Стек внимания
         self.reasoning_log: List[Dict[str, Any]] = []
         self.critique_enabled = True
+        self._active_count = 0  # Число мыслей со статусом ACTIVE
         
         # Граф для анализа связей
         self.thought_graph = nx.DiGraph()
@@ -164,6 +177,7 @@ class ThoughtTreeModule:
             thought.context = context
             
         self.thoughts[thought.id] = thought
+        self._track_thought(thought)
         
         # Обновить связи
         if parent_id and parent_id in self.thoughts:
@@ -187,6 +201,23 @@ class ThoughtTreeModule:
         
         return thought.id
     
+    @property
+    def active_thought_count(self) -> int:
+        """Число активных мыслей (O(1), поддерживается при смене статуса)"""
+        return self._active_count
+    
+    def _track_thought(self, thought: Thought):
+        """Учитывать статус мысли в счетчике активных мыслей"""
+        thought._status_listener = self._on_thought_status_change
+        if thought.status is ThoughtStatus.ACTIVE:
+            self._active_count += 1
+    
+    def _on_thought_status_change(self, old: ThoughtStatus, new: ThoughtStatus):
+        if old is ThoughtStatus.ACTIVE:
+            self._active_count -= 1
+        elif new is ThoughtStatus.ACTIVE:
+            self._active_count += 1
+    
     def branch_thought(self, 
                       parent_id: str, 
                       alternatives: List[str],
@@ -391,15 +422,15 @@ class ThoughtTreeModule:
         critiques = []
         
         # Критика на основе типа мысли
-        if thought.thought_type == ThoughtType.HYPOTHESIS:
+        if thought.thought_type is ThoughtType.HYPOTHESIS:
             critiques.append(f"Какие доказательства поддерживают гипотезу: '{thought.content}'?")
             critiques.append(f"Какие альтернативные объяснения возможны?")
             
-        elif thought.thought_type == ThoughtType.PLAN:
+        elif thought.thought_type is ThoughtType.PLAN:
             critiques.append(f"Какие риски связаны с планом: '{thought.content}'?")
             critiques.append(f"Что может пойти не так при выполнении этого плана?")
             
-        elif thought.thought_type == ThoughtType.DECISION:
+        elif thought.thought_type is ThoughtType.DECISION:
             critiques.append(f"Рассмотрены ли все варианты при принятии решения: '{thought.content}'?")
             critiques.append(f"Каковы долгосрочные последствия этого решения?")
             
@@ -472,8 +503,8 @@ class ThoughtTreeModule:
     def get_reasoning_summary(self) -> str:
         """Получить сводку рассуждений"""
         total_thoughts = len(self.thoughts)
-        active_thoughts = sum(1 for t in self.thoughts.values() if t.status == ThoughtStatus.ACTIVE)
-        selected_thoughts = sum(1 for t in self.thoughts.values() if t.status == ThoughtStatus.SELECTED)
+        active_thoughts = self._active_count
+        selected_thoughts = sum(1 for t in self.thoughts.values() if t.status is ThoughtStatus.SELECTED)
         
         type_counts = {}
         for thought in self.thoughts.values():
@@ -510,9 +541,9 @@ class ThoughtTreeModule:
         if len(self.reasoning_log) > 1000:
             self.reasoning_log = self.reasoning_log[-1000:]
     
-    def save_to_file(self, filepath: str):
-        """Сохранить дерево мыслей в файл"""
-        data = {
+    def to_dict(self) -> Dict[str, Any]:
+        """Дерево мыслей в виде dict"""
+        return {
             "thoughts": {tid: thought.to_dict() for tid, thought in self.thoughts.items()},
             "branches": {bid: {
                 "id": branch.id,
@@ -527,6 +558,8 @@ class ThoughtTreeModule:
             "attention_stack": self.attention_stack,
             "reasoning_log": self.reasoning_log[-100:]
         }
-        
+    
+    def save_to_file(self, filepath: str):
+        """Сохранить дерево мыслей в файл"""
         with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2) 
\ No newline at end of file
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2) 
\ No newline at end of file
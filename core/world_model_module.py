@@ -367,9 +367,9 @@ class WorldModelModule:
         if len(self.perception_log) > 1000:
             self.perception_log = self.perception_log[-1000:]
     
-    def save_to_file(self, filepath: str):
-        """Сохранить модель мира в файл"""
-        data = {
+    def to_dict(self) -> Dict[str, Any]:
+        """Модель мира в виде dict"""
+        return {
             "entities": {eid: entity.to_dict() for eid, entity in self.entities.items()},
             "facts": {fid: fact.to_dict() for fid, fact in self.facts.items()},
             "contexts": {cid: context.to_dict() for cid, context in self.contexts.items()},
@@ -377,9 +377,11 @@ class WorldModelModule:
             "world_state": self.world_state,
             "perception_log": self.perception_log[-100:]  # Сохранить последние 100 записей
         }
-        
+    
+    def save_to_file(self, filepath: str):
+        """Сохранить модель мира в файл"""
         with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2) 
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2) 
 
     def update_knowledge(self, new_information: str, source: str = "interaction", confidence: float = 0.8):
         """Обновить знания о мире с динамическим обучением"""
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Тест кучи активных целей GoalModule (ленивое удаление устаревших записей)
+"""
+
+import os
+import random
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.goal_module import GoalModule, GoalPriority, GoalStatus, PRIORITY_RANK
+
+
+def _expected_best(module: GoalModule):
+    """Эталон: наивысший приоритет, затем наибольший прогресс среди активных целей"""
+    active = [g for g in module.goals.values() if g.status is GoalStatus.ACTIVE]
+    if not active:
+        return None
+    return max((PRIORITY_RANK[g.priority], g.progress) for g in active)
+
+
+def _key(goal):
+    return None if goal is None else (PRIORITY_RANK[goal.priority], goal.progress)
+
+
+def test_progress_update_supersedes_old_entry():
+    """Устаревшая запись после обновления прогресса пропускается"""
+    module = GoalModule()
+    low = module.add_goal("Тестовая цель A", "testing", GoalPriority.LOW)
+    high = module.add_goal("Тестовая цель B", "testing", GoalPriority.HIGH)
+    module.update_goal_progress(high, 0.9)
+    assert module.get_next_goal().id == high
+
+    module.update_goal_progress(high, 0.1)
+    best = module.get_next_goal()
+    assert _key(best) == _expected_best(module)
+    assert module.goals[low].status is GoalStatus.ACTIVE
+
+
+def test_completed_goal_is_skipped():
+    """Завершенная цель больше не возвращается"""
+    module = GoalModule()
+    goal_id = module.add_goal("Тестовая цель C", "testing", GoalPriority.HIGH)
+    module.update_goal_progress(goal_id, 0.99)
+    assert module.get_next_goal().id == goal_id
+
+    module.complete_goal(goal_id)
+    best = module.get_next_goal()
+    assert best is None or best.id != goal_id
+    assert _key(best) == _expected_best(module)
+
+
+def test_priority_change_is_respected():
+    """Изменение приоритета с новой записью в куче меняет порядок целей"""
+    module = GoalModule()
+    goal_id = module.add_goal("Тестовая цель D", "testing", GoalPriority.LOW)
+    goal = module.goals[goal_id]
+    goal.priority = GoalPriority.HIGH
+    module.update_goal_progress(goal_id, 1.0 - 1e-9)
+    assert module.get_next_goal().id == goal_id
+
+
+def test_random_operations_match_reference():
+    """Случайная последовательность операций совпадает с полным перебором"""
+    rng = random.Random(7)
+    module = GoalModule()
+    ids = [module.add_goal(f"Случайная цель {i}", "testing", rng.choice(list(GoalPriority)))
+           for i in range(30)]
+
+    for _ in range(500):
+        goal_id = rng.choice(ids)
+        action = rng.random()
+        if action < 0.7:
+            module.update_goal_progress(goal_id, rng.random() * 0.99)
+        elif action < 0.85:
+            module.complete_goal(goal_id)
+        else:
+            ids.append(module.add_goal(f"Случайная цель {len(ids)}", "testing",
+                                       rng.choice(list(GoalPriority))))
+        assert _key(module.get_next_goal()) == _expected_best(module)
+
+    # Куча не разрастается из-за устаревших записей
+    assert len(module._active_heap) <= 2 * len(module.goals) + 16
+
+
+if __name__ == "__main__":
+    test_progress_update_supersedes_old_entry()
+    test_completed_goal_is_skipped()
+    test_priority_change_is_respected()
+    test_random_operations_match_reference()
+    print("✅ Тесты кучи целей пройдены")
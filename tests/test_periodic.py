@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Тест общего планировщика периодических задач
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.periodic import schedule_every
+
+
+def _wait_for(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return predicate()
+
+
+def test_schedule_every_repeats():
+    """Задача выполняется повторно с заданным интервалом"""
+    calls = []
+    task = schedule_every(0.02, lambda: calls.append(time.monotonic()))
+    try:
+        assert _wait_for(lambda: len(calls) >= 3)
+    finally:
+        task.cancel()
+    assert calls[1] - calls[0] >= 0.015
+
+
+def test_cancel_stops_further_runs():
+    """После cancel задача больше не вызывается"""
+    calls = []
+    task = schedule_every(0.01, lambda: calls.append(1))
+    assert _wait_for(lambda: len(calls) >= 1)
+    task.cancel()
+    assert not task.active
+    time.sleep(0.05)  # Уже начатый вызов мог завершиться после cancel
+    count = len(calls)
+    time.sleep(0.1)
+    assert len(calls) == count
+
+
+def test_cancel_long_interval_is_immediate():
+    """Отмена задачи с часовым интервалом не ждет окончания интервала"""
+    task = schedule_every(3600, lambda: None)
+    started = time.monotonic()
+    task.cancel()
+    assert time.monotonic() - started < 0.1
+
+
+def test_short_task_not_blocked_by_long_one():
+    """Новая короткая задача будит поток, спящий до часовой задачи"""
+    long_task = schedule_every(3600, lambda: None)
+    fired = threading.Event()
+    short_task = schedule_every(0.01, fired.set)
+    try:
+        assert fired.wait(1.0)
+    finally:
+        short_task.cancel()
+        long_task.cancel()
+
+
+def test_failing_task_keeps_running():
+    """Исключение в задаче не останавливает ее и общий поток"""
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise RuntimeError("boom")
+
+    task = schedule_every(0.01, failing)
+    try:
+        assert _wait_for(lambda: len(calls) >= 2)
+    finally:
+        task.cancel()
+
+
+if __name__ == "__main__":
+    test_schedule_every_repeats()
+    test_cancel_stops_further_runs()
+    test_cancel_long_interval_is_immediate()
+    test_short_task_not_blocked_by_long_one()
+    test_failing_task_keeps_running()
+    print("✅ Тесты планировщика пройдены")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Тест поиска SimpleMemory: порядок результатов совпадает с полным перебором
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# memory_module импортирует chromadb и sentence_transformers на уровне модуля
+pytest.importorskip("chromadb")
+pytest.importorskip("sentence_transformers")
+
+from core.memory_module import SimpleMemory
+
+
+def _reference_search(memory: SimpleMemory, query: str, limit: int):
+    """Прежняя реализация: перебор всех эпизодов, сортировка по (-совпадения, порядок)"""
+    query_words = set(query.lower().split())
+    if not query_words or limit <= 0:
+        return []
+    scored = []
+    for episode in memory.buffer:
+        count = len(query_words & set(episode.content.lower().split()))
+        if count:
+            scored.append((-count, episode.order, episode))
+    scored.sort(key=lambda item: (item[0], item[1]))
+    return [
+        {
+            "id": episode.id,
+            "content": episode.content,
+            "metadata": episode.metadata,
+            "relevance": -neg_count / len(query_words)
+        }
+        for neg_count, _, episode in scored[:limit]
+    ]
+
+
+def _fill(memory: SimpleMemory, rng: random.Random, vocab, count: int):
+    for _ in range(count):
+        content = " ".join(rng.choices(vocab, k=rng.randint(0, 12)))
+        # Повторяющиеся id проверяют замену эпизода, переполнение - вытеснение
+        memory.store(f"ep{rng.randint(0, count // 2)}", content, {"type": "test"})
+
+
+def test_search_matches_reference():
+    rng = random.Random(3)
+    vocab = [f"w{i}" for i in range(60)]
+    memory = SimpleMemory(max_episodes=200)
+    _fill(memory, rng, vocab, 600)
+
+    for _ in range(1000):
+        query = " ".join(rng.choices(vocab + ["absent"], k=rng.randint(0, 8)))
+        limit = rng.randint(-1, 30)
+        assert memory.search_simple(query, limit) == _reference_search(memory, query, limit)
+
+
+def test_ties_prefer_earlier_episodes():
+    memory = SimpleMemory()
+    memory.store("a", "кошка собака", {})
+    memory.store("b", "кошка", {})
+    memory.store("c", "кошка собака", {})
+
+    results = memory.search_simple("кошка собака", 3)
+    assert [r["id"] for r in results] == ["a", "c", "b"]
+    assert [r["relevance"] for r in results] == [1.0, 1.0, 0.5]
+
+
+def test_retrieve_recent_newest_first():
+    memory = SimpleMemory(max_episodes=3)
+    for i in range(5):
+        memory.store(f"id{i}", f"text {i}", {})
+    assert [r["id"] for r in memory.retrieve_recent(2)] == ["id4", "id3"]
+    assert len(memory.retrieve_recent(10)) == 3
+
+
+if __name__ == "__main__":
+    test_search_matches_reference()
+    test_ties_prefer_earlier_episodes()
+    test_retrieve_recent_newest_first()
+    print("✅ Тесты SimpleMemory пройдены")